@@ -1,58 +1,53 @@
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import logging
 import os
 from dotenv import load_dotenv
 
-# Import the original app
-import main as original_app
-
-# Import our new routes
-from merge_routes import router as merge_supabase_router
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-# Load environment variables
+# Load environment variables before the modules below read their configuration
 load_dotenv()
 
-# Create the combined app
-app = FastAPI(title="Merge API Integration")
+from merge_client import merge_client, MERGE_API_KEY  # noqa: E402
+from sync_jobs import sync_jobs  # noqa: E402
+from webhook_queue import webhook_ingestor  # noqa: E402
+
+# Import the original routes
+from main import router as original_router  # noqa: E402
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for testing
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Import our new routes
+from merge_routes import router as merge_supabase_router  # noqa: E402
+from webhook_routes import router as webhook_router  # noqa: E402
 
-# Include the original routes
-@app.get("/health")
-async def health_check():
-    return await original_app.health_check()
+from log_config import setup_logging, LogContextMiddleware  # noqa: E402
+from metrics import registry, MetricsMiddleware, PROMETHEUS_CONTENT_TYPE  # noqa: E402
 
-@app.post("/create-link-token")
-async def create_link_token(request: original_app.LinkTokenRequest):
-    return await original_app.create_link_token(request)
+logger = logging.getLogger(__name__)
 
-@app.post("/exchange-token")
-async def exchange_token(request: original_app.TokenRequest):
-    return await original_app.exchange_token(request)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not MERGE_API_KEY:
+        logger.error("MERGE_API_KEY environment variable is not set; Merge requests will fail")
+    # Open the shared Merge connection pool once for the lifetime of the app
+    await merge_client.start()
+    logger.info("Merge client started (http2=%s, max_connections=%s)", merge_client.http2, merge_client.limits.max_connections)
+    # Apply queued webhook changes, including any left over from the last run
+    webhook_ingestor.start()
+    yield
+    await webhook_ingestor.shutdown()
+    await sync_jobs.shutdown()
+    await merge_client.aclose()
+    logger.info("Merge client closed")
 
-# Include the new routes
-app.include_router(merge_supabase_router)
+# Routes served by the combined app itself
+router = APIRouter()
 
 # Add documented constants for linked account info
 MERGE_LINKED_ACCOUNT_ID = os.getenv("MERGE_LINKED_ACCOUNT_ID", "f2f797a5-b45a-4ac8-a7bf-31f4ca91d095")
 MERGE_LINKED_ACCOUNT_TOKEN = os.getenv("MERGE_LINKED_ACCOUNT_TOKEN", "ZHpX1K-o1l0tbLomOcfMlvyfJeGZtAWYaG5cuNWNDoavq3Xn4JNEJw")
 
-@app.get("/linked-account-info")
+@router.get("/linked-account-info")
 async def get_linked_account_info():
     """
     Get the linked account information for easy reference
@@ -60,4 +55,65 @@ async def get_linked_account_info():
     return {
         "linked_account_id": MERGE_LINKED_ACCOUNT_ID,
         "account_token": MERGE_LINKED_ACCOUNT_TOKEN
-    } 
\ No newline at end of file
+    }
+
+@router.get("/merge-client/pool")
+async def get_merge_pool_stats():
+    """
+    Get connection pool usage for the shared Merge API client
+    """
+    return merge_client.pool_stats()
+
+@router.get("/merge-client/scheduler")
+async def get_merge_scheduler_metrics():
+    """
+    Get rate-limit scheduler metrics (queued, throttled and retried requests)
+    """
+    return merge_client.scheduler.metrics()
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus metrics: Merge latency, sync stage timings, row counters and active syncs
+    """
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+def create_app() -> FastAPI:
+    """
+    Build the combined app
+
+    Nothing here talks to Merge or Supabase: the Merge connection pool is
+    opened in the lifespan hook and the Supabase client on first use.
+    """
+    setup_logging()
+    app = FastAPI(title="Merge API Integration", lifespan=lifespan)
+
+    # Per-route log level and sampling
+    app.add_middleware(LogContextMiddleware)
+
+    # Request timing histogram and optional Server-Timing header
+    app.add_middleware(MetricsMiddleware)
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins for testing
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Include the original routes
+    app.include_router(original_router)
+
+    # Include the new routes
+    app.include_router(merge_supabase_router)
+
+    # Include the Merge webhook receiver
+    app.include_router(webhook_router)
+
+    # Include the app-level info routes
+    app.include_router(router)
+    return app
+
+app = create_app()
@@ -0,0 +1,199 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from candidate_transform import CANDIDATE_COLUMNS, RecordSpec
+
+logger = logging.getLogger(__name__)
+
+# Column specs for the other Merge ATS models, in the same
+# (column, kind, source key, default) form as CANDIDATE_COLUMNS.
+# Parent columns (e.g. candidate_merge_id) hold the parent's Merge id and
+# default to None, so a missing parent is stored as NULL rather than an empty string.
+JOB_COLUMNS: List[Tuple[str, str, str, Any]] = [
+    ("merge_id", "field", "id", ""),
+    ("remote_id", "field", "remote_id", ""),
+    ("name", "field", "name", ""),
+    ("description", "field", "description", ""),
+    ("code", "field", "code", ""),
+    ("status", "field", "status", ""),
+    ("type", "field", "type", ""),
+    ("confidential", "field", "confidential", False),
+    ("created_at", "field", "created_at", ""),
+    ("modified_at", "field", "modified_at", ""),
+    ("remote_created_at", "field", "remote_created_at", ""),
+    ("remote_updated_at", "field", "remote_updated_at", ""),
+    ("job_posting_urls_json", "json", "job_posting_urls", []),
+    ("departments_json", "json", "departments", []),
+    ("offices_json", "json", "offices", []),
+    ("hiring_managers_json", "json", "hiring_managers", []),
+    ("recruiters_json", "json", "recruiters", []),
+    ("field_mappings_json", "json", "field_mappings", {}),
+    ("remote_was_deleted", "field", "remote_was_deleted", False),
+]
+
+APPLICATION_COLUMNS: List[Tuple[str, str, str, Any]] = [
+    ("merge_id", "field", "id", ""),
+    ("remote_id", "field", "remote_id", ""),
+    ("candidate_merge_id", "field", "candidate", None),
+    ("job_merge_id", "field", "job", None),
+    ("applied_at", "field", "applied_at", None),
+    ("rejected_at", "field", "rejected_at", None),
+    ("source", "field", "source", ""),
+    ("credited_to", "field", "credited_to", None),
+    ("current_stage", "field", "current_stage", None),
+    ("reject_reason", "field", "reject_reason", None),
+    ("created_at", "field", "created_at", ""),
+    ("modified_at", "field", "modified_at", ""),
+    ("remote_created_at", "field", "remote_created_at", ""),
+    ("remote_updated_at", "field", "remote_updated_at", ""),
+    ("offers_json", "json", "offers", []),
+    ("field_mappings_json", "json", "field_mappings", {}),
+    ("remote_was_deleted", "field", "remote_was_deleted", False),
+]
+
+INTERVIEW_COLUMNS: List[Tuple[str, str, str, Any]] = [
+    ("merge_id", "field", "id", ""),
+    ("remote_id", "field", "remote_id", ""),
+    ("application_merge_id", "field", "application", None),
+    ("job_interview_stage", "field", "job_interview_stage", None),
+    ("organizer", "field", "organizer", None),
+    ("location", "field", "location", ""),
+    ("start_at", "field", "start_at", None),
+    ("end_at", "field", "end_at", None),
+    ("status", "field", "status", ""),
+    ("created_at", "field", "created_at", ""),
+    ("modified_at", "field", "modified_at", ""),
+    ("remote_created_at", "field", "remote_created_at", ""),
+    ("remote_updated_at", "field", "remote_updated_at", ""),
+    ("interviewers_json", "json", "interviewers", []),
+    ("field_mappings_json", "json", "field_mappings", {}),
+    ("remote_was_deleted", "field", "remote_was_deleted", False),
+]
+
+OFFER_COLUMNS: List[Tuple[str, str, str, Any]] = [
+    ("merge_id", "field", "id", ""),
+    ("remote_id", "field", "remote_id", ""),
+    ("application_merge_id", "field", "application", None),
+    ("creator", "field", "creator", None),
+    ("status", "field", "status", ""),
+    ("closed_at", "field", "closed_at", None),
+    ("sent_at", "field", "sent_at", None),
+    ("start_date", "field", "start_date", None),
+    ("created_at", "field", "created_at", ""),
+    ("modified_at", "field", "modified_at", ""),
+    ("remote_created_at", "field", "remote_created_at", ""),
+    ("field_mappings_json", "json", "field_mappings", {}),
+    ("remote_was_deleted", "field", "remote_was_deleted", False),
+]
+
+# Attachment metadata only; file contents stay behind file_url
+ATTACHMENT_COLUMNS: List[Tuple[str, str, str, Any]] = [
+    ("merge_id", "field", "id", ""),
+    ("remote_id", "field", "remote_id", ""),
+    ("candidate_merge_id", "field", "candidate", None),
+    ("file_name", "field", "file_name", ""),
+    ("file_url", "field", "file_url", ""),
+    ("attachment_type", "field", "attachment_type", ""),
+    ("created_at", "field", "created_at", ""),
+    ("modified_at", "field", "modified_at", ""),
+    ("field_mappings_json", "json", "field_mappings", {}),
+    ("remote_was_deleted", "field", "remote_was_deleted", False),
+]
+
+
+class MergeModel:
+    """
+    A Merge ATS model the sync engine knows how to copy into Supabase
+
+    Args:
+        name (str): Registry name, also the default Supabase table name
+        path (str): Merge list endpoint, e.g. "/ats/v1/candidates"
+        columns (List[Tuple[str, str, str, Any]]): Column spec for the table
+        conflict_key (str, optional): Upsert conflict column. Defaults to "merge_id".
+        depends_on (Tuple[str, ...], optional): Models whose Merge ids this
+            model's parent columns hold; they are synced first
+        endpoint (str, optional): Merge client timeout key. Defaults to name.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        columns: List[Tuple[str, str, str, Any]],
+        conflict_key: str = "merge_id",
+        depends_on: Tuple[str, ...] = (),
+        endpoint: Optional[str] = None,
+    ):
+        self.name = name
+        self.path = path
+        self.spec = RecordSpec(columns)
+        self.conflict_key = conflict_key
+        self.depends_on = tuple(depends_on)
+        self.endpoint = endpoint or name
+
+    @property
+    def table_name(self) -> str:
+        return self.name
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.spec.names
+
+
+MODEL_REGISTRY: Dict[str, MergeModel] = {}
+
+
+def register_model(model: MergeModel) -> MergeModel:
+    for dependency in model.depends_on:
+        if dependency not in MODEL_REGISTRY:
+            raise ValueError(f"Model '{model.name}' depends on unregistered model '{dependency}'")
+    MODEL_REGISTRY[model.name] = model
+    return model
+
+
+def get_model(name: str) -> MergeModel:
+    model = MODEL_REGISTRY.get(name)
+    if model is None:
+        raise ValueError(f"Unknown Merge model '{name}'. Known models: {', '.join(MODEL_REGISTRY)}")
+    return model
+
+
+def dependency_order(names: Optional[List[str]] = None) -> List[MergeModel]:
+    """
+    Resolve model names into a list where every model follows the models it depends on
+
+    Dependencies that were not requested are not added. Parent columns are not
+    foreign keys, so a child syncs even when its parents are synced later;
+    ordering only makes the parents land first when both are requested.
+
+    Args:
+        names (List[str], optional): Models to sync. Defaults to every registered model.
+
+    Returns:
+        List[MergeModel]: The requested models in dependency order
+    """
+    requested = [get_model(name) for name in (names or list(MODEL_REGISTRY))]
+    selected = {model.name for model in requested}
+    ordered: List[MergeModel] = []
+    placed = set()
+    # Registration order is already a valid order, since register_model
+    # rejects dependencies that are not registered yet
+    for model in MODEL_REGISTRY.values():
+        if model.name in selected and model.name not in placed:
+            ordered.append(model)
+            placed.add(model.name)
+    return ordered
+
+
+CANDIDATES = register_model(MergeModel("candidates", "/ats/v1/candidates", CANDIDATE_COLUMNS))
+JOBS = register_model(MergeModel("jobs", "/ats/v1/jobs", JOB_COLUMNS))
+APPLICATIONS = register_model(MergeModel(
+    "applications", "/ats/v1/applications", APPLICATION_COLUMNS, depends_on=("candidates", "jobs")
+))
+INTERVIEWS = register_model(MergeModel(
+    "interviews", "/ats/v1/interviews", INTERVIEW_COLUMNS, depends_on=("applications",)
+))
+OFFERS = register_model(MergeModel("offers", "/ats/v1/offers", OFFER_COLUMNS, depends_on=("applications",)))
+ATTACHMENTS = register_model(MergeModel(
+    "attachments", "/ats/v1/attachments", ATTACHMENT_COLUMNS, depends_on=("candidates",)
+))
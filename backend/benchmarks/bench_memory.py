@@ -0,0 +1,104 @@
+"""
+Memory benchmark for transformed rows and a full candidate sync
+
+Measures, with tracemalloc:
+  batch  memory held by --batch transformed rows as dicts (with JSON strings)
+         and as a compact RowBatch (tuples with JSON bytes), plus the upsert body
+  sync   peak traced memory of a full sync of --records candidates against
+         local fake Merge and PostgREST servers (run in their own processes)
+
+Usage:
+    python benchmarks/bench_memory.py [--records 100000] [--batch 10000] [--scenarios batch sync]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import ServerProcess, fake_supabase_key  # noqa: E402
+from benchmarks.synthetic import make_candidates  # noqa: E402
+
+
+def traced(fn):
+    """
+    Run fn and return (result, bytes still allocated by it, peak bytes during it)
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def bench_batch(size):
+    from candidate_transform import CANDIDATE_SPEC, RowBatch, transform_candidates, transform_compact
+
+    candidates = make_candidates(size)
+    print(f"{'rows':>8}  {'variant':<16} {'held MB':>9} {'bytes/row':>10}")
+    variants = {
+        "dict rows": lambda: transform_candidates(candidates),
+        "compact rows": lambda: RowBatch(CANDIDATE_SPEC, transform_compact(candidates, CANDIDATE_SPEC)),
+    }
+    for name, fn in variants.items():
+        _, held, _ = traced(fn)
+        print(f"{size:>8}  {name:<16} {held / 2**20:>9.1f} {held / size:>10,.0f}")
+
+    batch = RowBatch(CANDIDATE_SPEC, transform_compact(candidates, CANDIDATE_SPEC))
+    started = time.perf_counter()
+    body = batch.encode()
+    elapsed = time.perf_counter() - started
+    print(f"{size:>8}  {'upsert body':<16} {len(body) / 2**20:>9.1f} {len(body) / size:>10,.0f}  "
+          f"({size / elapsed:,.0f} rows/s to encode)")
+
+
+def bench_sync(records):
+    merge_fake = ServerProcess("merge", record_count=records)
+    postgrest_fake = ServerProcess("postgrest", store_rows=False)
+    with merge_fake as merge_server, postgrest_fake as postgrest_server:
+        os.environ.update({
+            "MERGE_API_KEY": "bench",
+            "MERGE_API_BASE_URL": f"{merge_server.url}/api",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": fake_supabase_key(),
+            "SYNC_STATE_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-memory-"), "sync_state.db"),
+            "MERGE_RATE_PER_SECOND": "10000",
+            "MERGE_RATE_BURST": "10000",
+            "LOG_LEVEL": "WARNING",
+        })
+        import merge_supabase
+
+        # Create the client (and import supabase-py) before tracing starts
+        merge_supabase.get_supabase()
+        started = time.perf_counter()
+        result, _, peak = traced(lambda: asyncio.run(
+            merge_supabase.sync_candidates_to_supabase("bench-memory-account", full=True, resume=False)
+        ))
+        elapsed = time.perf_counter() - started
+    if not result.get("success"):
+        raise RuntimeError(f"Sync failed: {result}")
+    print(f"sync of {result['count']:,} candidates: peak traced memory {peak / 2**20:.1f} MB "
+          f"({elapsed:.1f}s with tracing)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000, help="Candidates in the synced tenant")
+    parser.add_argument("--batch", type=int, default=10_000, help="Rows in the batch comparison")
+    parser.add_argument("--scenarios", nargs="+", default=["batch", "sync"], choices=["batch", "sync"])
+    args = parser.parse_args()
+
+    if "batch" in args.scenarios:
+        bench_batch(args.batch)
+    if "sync" in args.scenarios:
+        bench_sync(args.records)
+
+
+if __name__ == "__main__":
+    main()
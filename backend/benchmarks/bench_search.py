@@ -0,0 +1,64 @@
+"""
+Benchmark for the local candidate search index
+
+Indexes --records synthetic candidates in sync-sized batches, then times a
+set of typical queries (name and email prefixes, company plus title, tags,
+remote_updated_at ranges) and reports the index's estimated memory.
+
+Usage:
+    python benchmarks/bench_search.py [--records 100000] [--batch 100] [--repeat 50]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candidate_transform import CANDIDATE_SPEC, RowBatch, transform_compact  # noqa: E402
+from search_index import SearchIndexes  # noqa: E402
+from benchmarks.synthetic import make_candidates  # noqa: E402
+
+QUERIES = [
+    ("name prefix", "first4242", {}),
+    ("full email", "candidate4242@example.com", {}),
+    ("email prefix", "candidate42", {}),
+    ("company + title", "acme engineer", {}),
+    ("tags", "python remote", {}),
+    ("updated range", "", {"updated_after": "2024-02-10T00:00:00Z", "updated_before": "2024-02-12T00:00:00Z"}),
+    ("tag + range", "senior", {"updated_after": "2024-02-20T00:00:00Z"}),
+    ("everything", "", {}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=100, help="Rows per indexed batch, as in a sync page")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = transform_compact(make_candidates(args.records), CANDIDATE_SPEC)
+    indexes = SearchIndexes(max_bytes=2**40, enabled=True)
+    started = time.perf_counter()
+    for start in range(0, len(rows), args.batch):
+        indexes.index_rows("bench-search-account", "candidates", RowBatch(CANDIDATE_SPEC, rows[start:start + args.batch]))
+    elapsed = time.perf_counter() - started
+    print(f"indexed {args.records:,} candidates in {elapsed:.2f}s ({args.records / elapsed:,.0f} rows/s), "
+          f"estimated {indexes.size / 2**20:.1f} MB")
+
+    print(f"{'query':<16} {'matches':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, query, options in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = indexes.search("bench-search-account", "candidates", query, limit=20, **options)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(0.99 * len(timings)))]
+        print(f"{name:<16} {result['count']:>8} {statistics.median(timings):>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Startup benchmark and regression check
+
+Measures, in fresh interpreters:
+  - import time of app.py (module import plus create_app)
+  - time to first request: from spawning uvicorn until GET /health answers
+and checks that modules which must stay lazy (the Supabase client, redis) are
+not imported by app.py.
+
+Results are compared with benchmarks/startup_baseline.json. With --check the
+script exits 1 when a median is more than --tolerance slower than the
+baseline, or when a lazy module is imported eagerly. Baselines are machine
+specific; refresh them with --save after an intended change.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--check] [--save] [--tolerance 0.5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import free_port  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+# Modules app.py must not import at startup; they are loaded on first use
+LAZY_MODULES = ["supabase", "postgrest", "redis"]
+
+IMPORT_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "eager": [name for name in %r if name in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def startup_env():
+    # No real credentials: startup must not need them
+    env = dict(os.environ)
+    env.update({"MERGE_API_KEY": env.get("MERGE_API_KEY", "bench"), "LOG_LEVEL": "WARNING"})
+    return env
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=BACKEND_DIR, env=startup_env(),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_first_request(timeout=30.0):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=startup_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client() as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise RuntimeError("uvicorn exited before serving a request")
+                time.sleep(0.005)
+        raise RuntimeError(f"No response from /health within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Fail on a regression against the baseline")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    first_requests = [measure_first_request() for _ in range(args.runs)]
+    results = {
+        "import_seconds": round(statistics.median(run["seconds"] for run in imports), 3),
+        "first_request_seconds": round(statistics.median(first_requests), 3),
+    }
+    eager = sorted({name for run in imports for name in run["eager"]})
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    print(f"{'metric':<24} {'median':>8} {'baseline':>9}")
+    failures = []
+    for metric, value in results.items():
+        expected = baseline.get(metric)
+        print(f"{metric:<24} {value:>8.3f} {expected if expected is not None else '-':>9}")
+        if expected and value > expected * (1 + args.tolerance):
+            failures.append(f"{metric} {value:.3f}s is more than {args.tolerance:.0%} over the baseline {expected:.3f}s")
+    if eager:
+        failures.append(f"app.py imports {', '.join(eager)} eagerly")
+
+    if args.save:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"saved baseline to {BASELINE_PATH}")
+
+    if failures:
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        if args.check:
+            sys.exit(1)
+    else:
+        print("no startup regressions")
+
+
+if __name__ == "__main__":
+    main()
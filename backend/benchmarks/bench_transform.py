@@ -0,0 +1,82 @@
+"""
+Micro-benchmark for the candidate transformer
+
+Usage:
+    python benchmarks/bench_transform.py [--sizes 10000 100000] [--repeat 3]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candidate_transform import transform_candidates, JSON_ENCODER  # noqa: E402
+from benchmarks.synthetic import make_candidates  # noqa: E402
+
+
+def legacy_transform(candidates):
+    """
+    The original per-record transform, kept here as the baseline
+    """
+    transformed_candidates = []
+    for candidate in candidates:
+        transformed_candidates.append({
+            "merge_id": candidate.get("id", ""),
+            "remote_id": candidate.get("remote_id", ""),
+            "first_name": candidate.get("first_name", ""),
+            "last_name": candidate.get("last_name", ""),
+            "company": candidate.get("company", ""),
+            "title": candidate.get("title", ""),
+            "email": candidate.get("email_addresses", [{}])[0].get("value", "") if candidate.get("email_addresses") else "",
+            "phone": candidate.get("phone_numbers", [{}])[0].get("value", "") if candidate.get("phone_numbers") else "",
+            "location": candidate.get("locations", [""])[0] if candidate.get("locations") else "",
+            "created_at": candidate.get("created_at", ""),
+            "modified_at": candidate.get("modified_at", ""),
+            "remote_created_at": candidate.get("remote_created_at", ""),
+            "remote_updated_at": candidate.get("remote_updated_at", ""),
+            "applications_json": json.dumps(candidate.get("applications", [])),
+            "attachments_json": json.dumps(candidate.get("attachments", [])),
+            "locations_json": json.dumps(candidate.get("locations", [])),
+            "phone_numbers_json": json.dumps(candidate.get("phone_numbers", [])),
+            "email_addresses_json": json.dumps(candidate.get("email_addresses", [])),
+            "urls_json": json.dumps(candidate.get("urls", [])),
+            "tags_json": json.dumps(candidate.get("tags", [])),
+            "field_mappings_json": json.dumps(candidate.get("field_mappings", {})),
+            "remote_was_deleted": candidate.get("remote_was_deleted", False),
+        })
+    return transformed_candidates
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"JSON encoder: {JSON_ENCODER}")
+    print(f"{'candidates':>10}  {'variant':<10} {'seconds':>9} {'rows/s':>12}")
+    for size in args.sizes:
+        candidates = make_candidates(size)
+        variants = {
+            "legacy": lambda: legacy_transform(candidates),
+            "rows": lambda: transform_candidates(candidates),
+            "columnar": lambda: transform_candidates(candidates, columnar=True),
+        }
+        for name, fn in variants.items():
+            seconds = best_of(fn, args.repeat)
+            print(f"{size:>10}  {name:<10} {seconds:>9.3f} {size / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Local scrape check for GET /metrics
+
+Runs one background sync through the app against local fake Merge and
+PostgREST servers, scrapes /metrics and checks that every expected series
+is present and consistent with the sync result. Exits 1 on a failure.
+
+Usage:
+    python benchmarks/check_metrics.py [--records 500]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (  # noqa: E402
+    ServerThread, create_fake_merge_app, create_fake_postgrest_app, fake_supabase_key
+)
+
+
+def parse_samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, _, value = line.rpartition(" ")
+            samples[series] = float(value)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=500)
+    args = parser.parse_args()
+
+    with ServerThread(create_fake_merge_app(record_count=args.records)) as merge_server, \
+            ServerThread(create_fake_postgrest_app()) as postgrest_server:
+        os.environ.update({
+            "MERGE_API_KEY": "fake",
+            "MERGE_API_BASE_URL": f"{merge_server.url}/api",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": fake_supabase_key(),
+            "SYNC_STATE_PATH": os.path.join(tempfile.mkdtemp(prefix="check-metrics-"), "sync_state.db"),
+            "METRICS_TIMING_HEADER": "true",
+            "LOG_LEVEL": "WARNING",
+        })
+        from fastapi.testclient import TestClient
+        import app
+
+        with TestClient(app.app) as client:
+            job = client.post(
+                "/merge-supabase/sync-candidates", json={"account_token": "metrics-check", "full": True}
+            ).json()
+            while True:
+                status = client.get(f"/merge-supabase/jobs/{job['job_id']}").json()
+                if status["status"] not in ("queued", "running", "cancelling"):
+                    break
+                time.sleep(0.05)
+            response = client.get("/metrics")
+
+    samples = parse_samples(response.text)
+    checks = {
+        "sync succeeded": status["status"] == "succeeded",
+        "Server-Timing header": response.headers.get("server-timing", "").startswith("app;dur="),
+        "rows fetched counter": samples.get('sync_rows_fetched_total{model="candidates"}') == args.records,
+        "rows written counter": samples.get('sync_rows_written_total{model="candidates"}') == args.records,
+        "Merge latency histogram": samples.get('merge_request_duration_seconds_count{endpoint="candidates",status="200"}', 0) > 0,
+        "transform histogram": samples.get('sync_transform_duration_seconds_count{model="candidates"}', 0) > 0,
+        "upsert latency histogram": samples.get('supabase_upsert_duration_seconds_count{table="candidates"}', 0) > 0,
+        "batch size histogram": samples.get('supabase_upsert_batch_rows_sum{table="candidates"}') == args.records,
+        "active syncs gauge": samples.get("sync_jobs_active") == 0,
+        "retries counter registered": "# TYPE merge_retries_total counter" in response.text,
+    }
+    for name, ok in checks.items():
+        print(f"{name:<28} {'ok' if ok else 'FAILED'}")
+    if not all(checks.values()):
+        sys.exit(1)
+    print("metrics scrape ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Deleted-record reconcile check
+
+Syncs candidates from a local fake Merge server into a fake PostgREST server,
+then hard-deletes some records and flags others as deleted in Merge, and
+runs the reconcile. Every vanished or flagged record must end up with
+remote_was_deleted set, every other row must be untouched, a second run
+must find nothing to do, and a run that would tombstone more than the
+safety limit must be refused without writing.
+
+Usage:
+    python benchmarks/check_reconcile.py [--records 1000] [--removed 50] [--flagged 20] [--seed 0]
+"""
+import os
+import sys
+import asyncio
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (  # noqa: E402
+    ServerThread, create_fake_merge_app, create_fake_postgrest_app, fake_candidate, fake_supabase_key, table_snapshot
+)
+
+TABLE = "candidates"
+ACCOUNT_TOKEN = "reconcile-check-account"
+
+
+def deleted_ids(postgrest):
+    return {merge_id for merge_id, row in table_snapshot(postgrest, TABLE).items() if row.get("remote_was_deleted")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--removed", type=int, default=50, help="Records hard-deleted from Merge")
+    parser.add_argument("--flagged", type=int, default=20, help="Records Merge flags as deleted")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    merge_app = create_fake_merge_app(record_count=args.records)
+    postgrest = create_fake_postgrest_app()
+    workdir = tempfile.mkdtemp(prefix="check-reconcile-")
+
+    with ServerThread(merge_app) as merge_server, ServerThread(postgrest) as postgrest_server:
+        os.environ.update({
+            "MERGE_API_KEY": "fake",
+            "MERGE_API_BASE_URL": f"{merge_server.url}/api",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": fake_supabase_key(),
+            "SYNC_STATE_PATH": os.path.join(workdir, "sync_state.db"),
+        })
+        import merge_supabase
+
+        async def check():
+            failures = []
+
+            def expect(name, ok, detail=""):
+                print(f"{name}: {'ok' if ok else 'FAIL'}{f' ({detail})' if detail else ''}")
+                if not ok:
+                    failures.append(name)
+
+            synced = await merge_supabase.sync_candidates_to_supabase(ACCOUNT_TOKEN, table_name=TABLE, full=True)
+            rows = table_snapshot(postgrest, TABLE)
+            expect("initial sync", synced["success"] and len(rows) == args.records, f"{len(rows)} rows")
+
+            rng = random.Random(args.seed)
+            picked = rng.sample(range(args.records), args.removed + args.flagged)
+            merge_app.state.removed = set(picked[:args.removed])
+            merge_app.state.deleted = set(picked[args.removed:])
+            expected = {fake_candidate(index)["id"] for index in picked}
+
+            dry = await merge_supabase.reconcile_deleted_records(ACCOUNT_TOKEN, table_name=TABLE, dry_run=True)
+            expect(
+                "dry run",
+                dry["success"] and dry["tombstones"] == args.removed and not deleted_ids(postgrest),
+                f"{dry.get('tombstones')} tombstones, nothing written",
+            )
+
+            result = await merge_supabase.reconcile_deleted_records(ACCOUNT_TOKEN, table_name=TABLE, batch_size=40)
+            deleted = deleted_ids(postgrest)
+            expect(
+                "reconcile",
+                result["success"] and result["soft_deleted"] == args.removed and result["flagged"] == args.flagged
+                and deleted == expected,
+                f"{result.get('soft_deleted')} soft-deleted, {result.get('flagged')} flagged, "
+                f"{len(deleted)} rows marked, {result.get('pages')} Merge pages",
+            )
+            untouched = all(
+                row == rows[merge_id] for merge_id, row in table_snapshot(postgrest, TABLE).items()
+                if merge_id not in expected
+            )
+            expect("other rows untouched", untouched)
+
+            again = await merge_supabase.reconcile_deleted_records(ACCOUNT_TOKEN, table_name=TABLE)
+            expect(
+                "second run is a no-op",
+                again["success"] and again["count"] == 0 and again["tombstones"] == 0,
+                f"{again.get('count')} rows written",
+            )
+
+            # Hard-delete most of what is left: the safety limit must refuse it
+            remaining = [index for index in range(args.records) if index not in merge_app.state.removed]
+            merge_app.state.removed |= set(remaining[:int(len(remaining) * 0.75)])
+            before = table_snapshot(postgrest, TABLE)
+            refused = await merge_supabase.reconcile_deleted_records(
+                ACCOUNT_TOKEN, table_name=TABLE, max_delete_fraction=0.5
+            )
+            expect(
+                "mass delete refused",
+                not refused["success"] and table_snapshot(postgrest, TABLE) == before,
+                refused.get("message", ""),
+            )
+            return failures
+
+        failures = asyncio.run(check())
+
+    if failures:
+        print(f"{len(failures)} checks failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("all reconcile checks passed")
+
+
+if __name__ == "__main__":
+    main()
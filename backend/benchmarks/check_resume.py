@@ -0,0 +1,128 @@
+"""
+Crash/resume check for checkpointed syncs
+
+Runs one uninterrupted sync against local fake Merge and PostgREST servers,
+then repeatedly kills syncs at random upsert batches (before or after the
+batch commits) and restarts them until they finish. Every trial must end
+with the same table contents and watermark as the uninterrupted run.
+
+Usage:
+    python benchmarks/check_resume.py [--records 1000] [--trials 20] [--seed 0]
+"""
+import os
+import sys
+import asyncio
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (  # noqa: E402
+    ServerThread, create_fake_merge_app, create_fake_postgrest_app, fake_supabase_key, table_snapshot
+)
+
+TABLE = "candidates"
+ACCOUNT_TOKEN = "resume-check-account"
+
+
+async def run_until_complete(merge_supabase, rng, kill_probability, max_restarts=1000):
+    """
+    Run the sync, killing it at random batches, until a run completes
+    """
+    original_upsert = merge_supabase.upsert_rows
+    kills = 0
+
+    for _ in range(max_restarts):
+        task = None
+
+        async def flaky_upsert(table_name, rows, on_conflict="merge_id"):
+            await asyncio.sleep(rng.random() * 0.005)
+            kill = rng.random() < kill_probability
+            if kill and rng.random() < 0.5:
+                task.cancel()
+                await asyncio.sleep(0)
+            result = await original_upsert(table_name, rows, on_conflict)
+            if kill:
+                # Crash after the batch committed but before the sync recorded it
+                task.cancel()
+                await asyncio.sleep(0)
+            return result
+
+        merge_supabase.upsert_rows = flaky_upsert
+        task = asyncio.create_task(merge_supabase.sync_candidates_to_supabase(
+            ACCOUNT_TOKEN, table_name=TABLE, full=True, chunk_size=70, write_concurrency=3
+        ))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            kills += 1
+            continue
+        finally:
+            merge_supabase.upsert_rows = original_upsert
+        if not result.get("success"):
+            raise RuntimeError(f"Sync failed: {result}")
+        if result["complete"]:
+            return result, kills
+    raise RuntimeError("Sync did not complete")
+
+
+def reset(postgrest, sync_state, path):
+    postgrest.state.tables = {}
+    sync_state.close()
+    sync_state.path = path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--kill-probability", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    merge_app = create_fake_merge_app(record_count=args.records)
+    postgrest = create_fake_postgrest_app()
+    workdir = tempfile.mkdtemp(prefix="check-resume-")
+
+    with ServerThread(merge_app) as merge_server, ServerThread(postgrest) as postgrest_server:
+        os.environ.update({
+            "MERGE_API_KEY": "fake",
+            "MERGE_API_BASE_URL": f"{merge_server.url}/api",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": fake_supabase_key(),
+            "SYNC_STATE_PATH": os.path.join(workdir, "reference.db"),
+        })
+        import merge_supabase
+        from sync_state import sync_state
+
+        async def check():
+            reference = await merge_supabase.sync_candidates_to_supabase(ACCOUNT_TOKEN, table_name=TABLE, full=True)
+            expected_rows = table_snapshot(postgrest, TABLE)
+            expected_watermark = sync_state.get_watermark(ACCOUNT_TOKEN, TABLE)
+            print(f"reference: {len(expected_rows)} rows, watermark {expected_watermark}")
+            assert reference["complete"] and len(expected_rows) == args.records
+
+            rng = random.Random(args.seed)
+            failures = 0
+            for trial in range(args.trials):
+                reset(postgrest, sync_state, os.path.join(workdir, f"trial-{trial}.db"))
+                result, kills = await run_until_complete(merge_supabase, rng, args.kill_probability)
+                rows = table_snapshot(postgrest, TABLE)
+                watermark = sync_state.get_watermark(ACCOUNT_TOKEN, TABLE)
+                ok = rows == expected_rows and watermark == expected_watermark
+                failures += not ok
+                resumed = "resumed" if result["resumed"] else "fresh"
+                print(f"trial {trial:>3}: {kills:>3} kills, final run {resumed}, {len(rows)} rows, {'ok' if ok else 'MISMATCH'}")
+            return failures
+
+        failures = asyncio.run(check())
+
+    if failures:
+        print(f"{failures} of {args.trials} trials did not match the uninterrupted run")
+        sys.exit(1)
+    print("all trials matched the uninterrupted run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Local stand-ins for the Merge ATS API and Supabase PostgREST
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import random
+import threading
+import subprocess
+from typing import Any, Dict, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from benchmarks.synthetic import make_candidate
+
+# Restoring one of a fixed set of generator states is much cheaper than
+# seeding a new Random per record, and keeps records deterministic by index
+_RNG_VARIANTS = 997
+_rng_states = [random.Random(variant).getstate() for variant in range(_RNG_VARIANTS)]
+_record_rng = random.Random()
+
+
+def fake_candidate(index: int) -> Dict[str, Any]:
+    _record_rng.setstate(_rng_states[index % _RNG_VARIANTS])
+    return make_candidate(index, _record_rng)
+
+
+def create_fake_merge_app(
+    record_count: int = 1000,
+    max_page_size: int = 100,
+    latency: float = 0.0,
+    throttle_rate: float = 0.0,
+    retry_after: float = 0.1,
+    seed: int = 0,
+) -> FastAPI:
+    """
+    Fake Merge ATS API serving record_count synthetic candidates
+
+    Supports cursor pagination, limit/offset, modified_after and
+    include_deleted_data on GET /api/ats/v1/candidates. Records are generated
+    on demand, so large record counts cost no memory. Indexes added to
+    app.state.removed vanish from the tenant (hard deletes); indexes in
+    app.state.deleted are flagged remote_was_deleted and only returned with
+    include_deleted_data=true.
+
+    Args:
+        record_count (int, optional): Candidates in the fake tenant. Defaults to 1000.
+        max_page_size (int, optional): Largest page the fake returns. Defaults to 100.
+        latency (float, optional): Seconds added to every response. Defaults to 0.
+        throttle_rate (float, optional): Share of requests answered with a 429. Defaults to 0.
+        retry_after (float, optional): Retry-After seconds sent with each 429. Defaults to 0.1.
+        seed (int, optional): Seed for which requests are throttled. Defaults to 0.
+    """
+    app = FastAPI()
+    app.state.record_count = record_count
+    app.state.removed = set()
+    app.state.deleted = set()
+    app.state.requests = 0
+    app.state.throttled = 0
+    throttle_rng = random.Random(seed)
+
+    @app.get("/api/ats/v1/candidates")
+    async def list_candidates(
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+        modified_after: Optional[str] = None,
+        include_deleted_data: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ):
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if throttle_rate and throttle_rng.random() < throttle_rate:
+            app.state.throttled += 1
+            return JSONResponse(status_code=429, content={"detail": "throttled"}, headers={"Retry-After": str(retry_after)})
+        page_size = max(1, min(page_size or limit or 100, max_page_size))
+        index = int(cursor) if cursor else offset
+        results = []
+        # Scan forward from the cursor so a full pass over the tenant is O(records)
+        while index < app.state.record_count and len(results) < page_size:
+            if index in app.state.removed or (index in app.state.deleted and not include_deleted_data):
+                index += 1
+                continue
+            candidate = fake_candidate(index)
+            if index in app.state.deleted:
+                candidate["remote_was_deleted"] = True
+            if not modified_after or candidate["modified_at"] > modified_after:
+                results.append(candidate)
+            index += 1
+        next_cursor = str(index) if index < app.state.record_count else None
+        # Encode directly; FastAPI's jsonable_encoder would dominate the fake's cost
+        body = json.dumps({"next": next_cursor, "previous": cursor, "results": results})
+        return Response(content=body, media_type="application/json")
+
+    @app.get("/_stats")
+    async def stats():
+        return {"requests": app.state.requests, "throttled": app.state.throttled}
+
+    return app
+
+
+def create_fake_postgrest_app(latency: float = 0.0, store_rows: bool = True) -> FastAPI:
+    """
+    Fake Supabase PostgREST endpoint that keeps tables in memory
+
+    Handles the upsert (POST with on_conflict), plain select (GET) and
+    filtered update (PATCH with eq./in. filters, as in soft deletes) calls
+    the backend makes through supabase-py.
+
+    Args:
+        latency (float, optional): Seconds added to every response. Defaults to 0.
+        store_rows (bool, optional): Keep upserted rows; turn off for
+            million-row load tests, where only the write count matters. Defaults to True.
+    """
+    app = FastAPI()
+    app.state.tables = {}
+    app.state.writes = 0
+
+    @app.post("/rest/v1/{table}")
+    async def upsert(table: str, request: Request):
+        rows = json.loads(await request.body())
+        if isinstance(rows, dict):
+            rows = [rows]
+        if latency:
+            await asyncio.sleep(latency)
+        key = request.query_params.get("on_conflict", "id")
+        if store_rows:
+            store = app.state.tables.setdefault(table, {})
+            for row in rows:
+                store[row.get(key)] = row
+        app.state.writes += len(rows)
+        if "return=minimal" in request.headers.get("prefer", ""):
+            return Response(status_code=201)
+        return JSONResponse(status_code=201, content=rows)
+
+    @app.patch("/rest/v1/{table}")
+    async def update(table: str, request: Request):
+        changes = json.loads(await request.body())
+        if latency:
+            await asyncio.sleep(latency)
+        stored = app.state.tables.get(table, {})
+        rows = list(stored.items())
+        for column, condition in request.query_params.items():
+            operator, _, value = condition.partition(".")
+            if operator == "eq":
+                values = {value}
+            elif operator == "in":
+                values = {item.strip('"') for item in value.strip("()").split(",")}
+            else:
+                continue
+            rows = [(key, row) for key, row in rows if str(row.get(column)) in values]
+        # Rows are replaced, not changed in place, so earlier snapshots stay intact
+        updated = {key: {**row, **changes} for key, row in rows}
+        stored.update(updated)
+        app.state.writes += len(updated)
+        if "return=minimal" in request.headers.get("prefer", ""):
+            return Response(status_code=204)
+        return JSONResponse(status_code=200, content=list(updated.values()))
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        rows = list(app.state.tables.get(table, {}).values())
+        offset = int(request.query_params.get("offset", 0))
+        limit = request.query_params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+        return rows
+
+    @app.get("/_stats")
+    async def stats():
+        return {"writes": app.state.writes}
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """
+    Run an ASGI app with uvicorn in a background thread
+    """
+
+    def __init__(self, app: Any, port: Optional[int] = None):
+        self.app = app
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+FAKE_FACTORIES = {"merge": create_fake_merge_app, "postgrest": create_fake_postgrest_app}
+
+
+def fake_app_from_env() -> FastAPI:
+    """
+    uvicorn factory for ServerProcess: builds the fake named in FAKE_APP with FAKE_APP_OPTIONS
+    """
+    return FAKE_FACTORIES[os.environ["FAKE_APP"]](**json.loads(os.environ.get("FAKE_APP_OPTIONS", "{}")))
+
+
+class ServerProcess:
+    """
+    Run a fake in its own process, so it does not share a GIL with the load generator
+
+    Counters are read over HTTP with stats().
+    """
+
+    def __init__(self, kind: str, port: Optional[int] = None, **options: Any):
+        self.kind = kind
+        self.options = options
+        self.port = port or free_port()
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def stats(self) -> Dict[str, Any]:
+        return httpx.get(f"{self.url}/_stats").json()
+
+    def __enter__(self) -> "ServerProcess":
+        env = dict(os.environ, FAKE_APP=self.kind, FAKE_APP_OPTIONS=json.dumps(self.options))
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "--factory", "benchmarks.fakes:fake_app_from_env",
+                "--port", str(self.port), "--log-level", "warning",
+            ],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env,
+        )
+        started = time.perf_counter()
+        while time.perf_counter() - started < 30:
+            try:
+                self.stats()
+                return self
+            except httpx.TransportError:
+                time.sleep(0.05)
+        raise RuntimeError(f"Fake {self.kind} server did not start")
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.process.terminate()
+        self.process.wait()
+
+
+def fake_supabase_key() -> str:
+    # supabase-py only checks that the key looks like a JWT
+    return "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.fake"
+
+
+def table_snapshot(app: FastAPI, table: str) -> Dict[str, Any]:
+    return dict(app.state.tables.get(table, {}))
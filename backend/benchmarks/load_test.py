@@ -0,0 +1,285 @@
+"""
+Load test for the sync, fetch and preview endpoints
+
+Starts local fake Merge and PostgREST servers (with configurable latency,
+page size, 429 injection and record counts up to 1M) and the app itself,
+each under uvicorn in its own process, then drives:
+
+  sync     POST /merge-supabase/sync-candidates, one full sync per concurrent
+           account (each into its own table), polled until it finishes
+  fetch    POST /merge-supabase/fetch-candidates at random cursors
+  preview  POST /merge-supabase/get-transformed-candidates at random cursors
+
+and reports throughput, p50/p99 latency and the app's peak RSS. Results are
+compared with benchmarks/load_baseline.json for the same configuration;
+--check exits 1 when throughput drops, or p99 latency or peak RSS grows, by
+more than --tolerance. Refresh the baseline with --save.
+
+Usage:
+    python benchmarks/load_test.py [--records 10000] [--concurrency 4] [--requests 200]
+        [--scenarios sync fetch preview] [--merge-latency 0.02] [--supabase-latency 0.01]
+        [--throttle-rate 0.05] [--page-size 100] [--check] [--save]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import (  # noqa: E402
+    ServerProcess, fake_supabase_key, free_port
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_baseline.json")
+
+# Metrics where a higher value is a regression; every other metric regresses when it drops
+HIGHER_IS_WORSE = {"p50_ms", "p99_ms", "peak_rss_mb"}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb(pid):
+    # VmHWM is the process's peak resident set size (Linux only)
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class AppProcess:
+    """
+    Run the app under uvicorn in a child process so its memory can be measured on its own
+    """
+
+    def __init__(self, env):
+        self.port = free_port()
+        self.env = env
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=self.env,
+        )
+        started = time.perf_counter()
+        while time.perf_counter() - started < 30:
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.TransportError:
+                time.sleep(0.05)
+        raise RuntimeError("App did not start")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+
+
+async def run_sync(client, args):
+    async def one(i):
+        response = await client.post("/merge-supabase/sync-candidates", json={
+            "account_token": f"load-test-account-{i}",
+            "table_name": f"candidates_load_{i}",
+            "full": True,
+            "resume": False,
+        })
+        job_id = response.json()["job_id"]
+        while True:
+            job = (await client.get(f"/merge-supabase/jobs/{job_id}")).json()
+            if job["status"] not in ("queued", "running", "cancelling"):
+                return job
+            await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    jobs = await asyncio.gather(*(one(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = [job["finished_at"] - job["started_at"] for job in jobs if job["started_at"]]
+    rows = sum(job["rows_written"] for job in jobs)
+    failed = [job for job in jobs if job["status"] != "succeeded"]
+    return {
+        "rows_per_sec": round(rows / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "operations": len(jobs),
+        "errors": len(failed),
+    }
+
+
+async def run_requests(client, args, path, body_for):
+    rng = random.Random(args.seed)
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        body = body_for(rng)
+        async with slots:
+            started = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "operations": len(latencies),
+        "errors": errors,
+    }
+
+
+async def run_scenarios(app_url, args):
+    max_start = max(args.records - args.page_size, 0)
+    async with httpx.AsyncClient(base_url=app_url, timeout=None) as client:
+        results = {}
+        for scenario in args.scenarios:
+            if scenario == "sync":
+                results[scenario] = await run_sync(client, args)
+            elif scenario == "fetch":
+                results[scenario] = await run_requests(client, args, "/merge-supabase/fetch-candidates", lambda rng: {
+                    "account_token": "load-test-fetch",
+                    "limit": args.page_size,
+                    "cursor": str(rng.randint(0, max_start)),
+                })
+            elif scenario == "preview":
+                results[scenario] = await run_requests(client, args, "/merge-supabase/get-transformed-candidates", lambda rng: {
+                    "account_token": "load-test-preview",
+                    "limit": args.page_size,
+                    "cursor": str(rng.randint(0, max_start)),
+                })
+        return results
+
+
+def config_key(args):
+    return ",".join(f"{name}={getattr(args, name)}" for name in (
+        "records", "concurrency", "requests", "page_size", "merge_latency", "supabase_latency", "throttle_rate", "cache"
+    ))
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(scenario, {}).get(metric)
+            if metric in ("operations", "errors") or not expected or value is None:
+                continue
+            if metric in HIGHER_IS_WORSE and value > expected * (1 + tolerance):
+                regressions.append(f"{scenario} {metric} {value} is above the baseline {expected}")
+            elif metric not in HIGHER_IS_WORSE and value < expected * (1 - tolerance):
+                regressions.append(f"{scenario} {metric} {value} is below the baseline {expected}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=10000, help="Candidates in the fake tenant (up to 1M)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per fetch/preview scenario")
+    parser.add_argument("--scenarios", nargs="+", default=["sync", "fetch", "preview"], choices=["sync", "fetch", "preview"])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--merge-latency", type=float, default=0.0, help="Seconds added to each fake Merge response")
+    parser.add_argument("--supabase-latency", type=float, default=0.0, help="Seconds added to each fake upsert")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of Merge requests answered with a 429")
+    parser.add_argument("--merge-rate", type=float, default=1000.0, help="Client-side Merge requests/sec per account")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache on for fetch/preview")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="Fail on a regression against the baseline")
+    parser.add_argument("--save", action="store_true", help="Store the results as the baseline for this configuration")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    merge_fake = ServerProcess(
+        "merge", record_count=args.records, max_page_size=args.page_size, latency=args.merge_latency,
+        throttle_rate=args.throttle_rate, seed=args.seed,
+    )
+    # Only the write count matters here, so the fake does not hold millions of rows
+    postgrest_fake = ServerProcess("postgrest", latency=args.supabase_latency, store_rows=False)
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+
+    with merge_fake as merge_server, postgrest_fake as postgrest_server:
+        env = dict(os.environ)
+        env.update({
+            "MERGE_API_KEY": "fake",
+            "MERGE_API_BASE_URL": f"{merge_server.url}/api",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": fake_supabase_key(),
+            "SYNC_STATE_PATH": os.path.join(workdir, "sync_state.db"),
+            "MERGE_RATE_PER_SECOND": str(args.merge_rate),
+            "MERGE_RATE_BURST": str(args.merge_rate),
+            "MERGE_HTTP2": "false",
+            "LOG_LEVEL": "WARNING",
+        })
+        if not args.cache:
+            env["RESPONSE_CACHE_TTL"] = "0"
+
+        with AppProcess(env) as app_process:
+            results = asyncio.run(run_scenarios(app_process.url, args))
+            rss = peak_rss_mb(app_process.process.pid)
+        merge_stats = merge_server.stats()
+
+    results["app"] = {"peak_rss_mb": rss}
+    key = config_key(args)
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    baseline = baselines.get(key, {})
+
+    print(f"config: {key}")
+    print(f"fake Merge: {merge_stats['requests']} requests, {merge_stats['throttled']} throttled")
+    print(f"{'scenario':<10} {'metric':<18} {'value':>12} {'baseline':>12}")
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(scenario, {}).get(metric)
+            print(f"{scenario:<10} {metric:<18} {str(value):>12} {str(expected if expected is not None else '-'):>12}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    errors = sum(metrics.get("errors", 0) for metrics in results.values())
+    if errors:
+        regressions.append(f"{errors} operations failed")
+
+    if args.save:
+        baselines[key] = results
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved baseline for this configuration to {BASELINE_PATH}")
+
+    if regressions:
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if args.check:
+            sys.exit(1)
+    elif baseline:
+        print("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Synthetic Merge ATS records for benchmarks
+"""
+import random
+from typing import Any, Dict, List
+
+TAGS = ["python", "java", "senior", "remote", "referral", "frontend", "backend", "manager"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+TITLES = ["Engineer", "Designer", "Product Manager", "Recruiter", "Data Scientist"]
+
+
+def make_candidate(i: int, rng: random.Random = random) -> Dict[str, Any]:
+    day = 1 + i % 28
+    return {
+        "id": f"00000000-0000-4000-8000-{i:012d}",
+        "remote_id": str(i),
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "company": rng.choice(COMPANIES),
+        "title": rng.choice(TITLES),
+        "created_at": f"2024-01-{day:02d}T00:00:00Z",
+        "modified_at": f"2024-02-{day:02d}T12:00:00Z",
+        "remote_created_at": f"2023-12-{day:02d}T00:00:00Z",
+        "remote_updated_at": f"2024-02-{day:02d}T11:00:00Z",
+        "last_interaction_at": None,
+        "is_private": False,
+        "can_email": True,
+        "locations": ["San Francisco, CA"],
+        "phone_numbers": [{"value": f"+1415555{i % 10000:04d}", "phone_number_type": "MOBILE"}],
+        "email_addresses": [{"value": f"candidate{i}@example.com", "email_address_type": "PERSONAL"}],
+        "urls": [{"value": f"https://example.com/{i}", "url_type": "PERSONAL"}],
+        "tags": rng.sample(TAGS, 3),
+        "applications": [f"10000000-0000-4000-8000-{i:012d}"],
+        "attachments": [f"20000000-0000-4000-8000-{i:012d}"],
+        "remote_was_deleted": False,
+        "field_mappings": {"organization_defined_targets": {}, "linked_account_defined_targets": {}},
+    }
+
+
+def make_candidates(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [make_candidate(i, rng) for i in range(count)]
@@ -0,0 +1,158 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import merge_supabase
+from merge_supabase import sync_candidates_to_supabase
+from sync_jobs import SyncJob, sync_jobs
+
+logger = logging.getLogger(__name__)
+
+# Fan-out configuration
+BULK_SYNC_CONCURRENCY = int(os.getenv("BULK_SYNC_CONCURRENCY", "16"))
+BULK_SYNC_PER_TENANT = int(os.getenv("BULK_SYNC_PER_TENANT", "2"))
+LINKED_ACCOUNTS_PAGE_SIZE = 1000
+
+
+async def load_linked_accounts(
+    table_name: str = "linked_accounts",
+    token_column: str = "account_token",
+    tenant_column: Optional[str] = "organization_id",
+) -> List[Dict[str, Any]]:
+    """
+    Read linked accounts from a Supabase table
+
+    Args:
+        table_name (str, optional): Table holding linked accounts. Defaults to "linked_accounts".
+        token_column (str, optional): Column with the Merge account token. Defaults to "account_token".
+        tenant_column (str, optional): Column grouping accounts by tenant. Defaults to "organization_id".
+
+    Returns:
+        List[Dict[str, Any]]: One {"account_token", "tenant"} dict per account
+    """
+    supabase = merge_supabase.get_supabase()
+    if not supabase:
+        raise RuntimeError("Supabase client not initialized")
+
+    columns = ",".join(column for column in (token_column, tenant_column) if column)
+    accounts = []
+    start = 0
+    while True:
+        result = await asyncio.to_thread(
+            lambda: supabase.table(table_name)
+            .select(columns)
+            .range(start, start + LINKED_ACCOUNTS_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = result.data or []
+        for row in rows:
+            if row.get(token_column):
+                accounts.append({
+                    "account_token": row[token_column],
+                    "tenant": str(row.get(tenant_column)) if tenant_column and row.get(tenant_column) else None,
+                })
+        if len(rows) < LINKED_ACCOUNTS_PAGE_SIZE:
+            break
+        start += LINKED_ACCOUNTS_PAGE_SIZE
+
+    logger.info("Loaded %d linked accounts from %s", len(accounts), table_name)
+    return accounts
+
+
+def _round_robin(accounts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Interleave accounts by tenant so one large tenant cannot claim every slot first
+    """
+    by_tenant: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for account in accounts:
+        by_tenant.setdefault(account["tenant"] or account["account_token"], []).append(account)
+    ordered = []
+    queues = list(by_tenant.values())
+    while queues:
+        for queue in queues:
+            ordered.append(queue.pop(0))
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+async def sync_many_accounts(
+    accounts: List[Dict[str, Any]],
+    table_name: str = "candidates",
+    max_concurrency: int = BULK_SYNC_CONCURRENCY,
+    per_tenant_limit: int = BULK_SYNC_PER_TENANT,
+    parent: Optional[SyncJob] = None,
+    **sync_options: Any,
+) -> Dict[str, Any]:
+    """
+    Sync candidates for many linked accounts concurrently
+
+    A global semaphore caps concurrent syncs and a per-tenant semaphore keeps
+    any one tenant from starving the rest. Each account runs as its own sync
+    job, so one account's failure is recorded in its result and does not
+    affect the others.
+
+    Args:
+        accounts (List[Dict[str, Any]]): {"account_token", "tenant"} dicts
+        table_name (str, optional): Supabase table name. Defaults to "candidates".
+        max_concurrency (int, optional): Global cap on concurrent syncs. Defaults to BULK_SYNC_CONCURRENCY.
+        per_tenant_limit (int, optional): Concurrent syncs per tenant. Defaults to BULK_SYNC_PER_TENANT.
+        parent (SyncJob, optional): Bulk job the account syncs are listed under in /jobs
+        **sync_options: Passed through to sync_candidates_to_supabase
+
+    Returns:
+        Dict[str, Any]: Per-account results and aggregate throughput
+    """
+    global_slots = asyncio.Semaphore(max(1, max_concurrency))
+    tenant_slots: Dict[str, asyncio.Semaphore] = {}
+    unique = OrderedDict((account["account_token"], account) for account in accounts)
+    accounts = list(unique.values())
+
+    async def sync_one(account: Dict[str, Any]) -> Dict[str, Any]:
+        token = account["account_token"]
+        tenant = account["tenant"] or token
+        summary = {"account_token": f"...{token[-4:]}", "tenant": account["tenant"]}
+
+        async def run(on_progress):
+            return await sync_candidates_to_supabase(
+                token, table_name=table_name, on_progress=on_progress, **sync_options
+            )
+
+        slots = tenant_slots.setdefault(tenant, asyncio.Semaphore(max(1, per_tenant_limit)))
+        async with slots, global_slots:
+            # Each account runs as a regular sync job, so it shows up under
+            # /jobs and respects the one-sync-per-account rule
+            try:
+                job = sync_jobs.submit(token, table_name, run, parent=parent)
+            except ValueError as e:
+                return {**summary, "success": False, "message": str(e)}
+            await asyncio.wait([job.task])
+
+        result = job.result or {"success": False, "message": job.error or f"Sync {job.status}"}
+        return {
+            **summary,
+            **result,
+            "job_id": job.id,
+            "status": job.status,
+            "elapsed_seconds": round((job.finished_at or time.time()) - (job.started_at or job.created_at), 3),
+        }
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(sync_one(account) for account in _round_robin(accounts)))
+    elapsed = time.perf_counter() - started
+
+    rows = sum(result.get("count", 0) or 0 for result in results)
+    succeeded = sum(1 for result in results if result.get("success"))
+    return {
+        "success": succeeded == len(results),
+        "message": f"{len(results) - succeeded} of {len(results)} account syncs failed" if succeeded < len(results) else None,
+        "accounts": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "rows": rows,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else 0.0,
+        "results": results,
+    }
@@ -0,0 +1,310 @@
+import json
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Use orjson when it is installed; it is several times faster than json.dumps
+try:
+    import orjson
+
+    def encode_json(value: Any) -> str:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            # orjson rejects some inputs json accepts (e.g. non-str dict keys)
+            return json.dumps(value)
+
+    def encode_json_bytes(value: Any) -> bytes:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            return json.dumps(value).encode("utf-8")
+
+    def compact_json_bytes(value: Any) -> bytes:
+        # orjson's result keeps its initial buffer (about 1 KB) however short
+        # the output is; values held in memory are copied down to size
+        return bytes(memoryview(encode_json_bytes(value)))
+
+    JSON_ENCODER = "orjson"
+except ImportError:
+    encode_json = json.dumps
+
+    def encode_json_bytes(value: Any) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    compact_json_bytes = encode_json_bytes
+    JSON_ENCODER = "json"
+
+# Declarative column spec for the Supabase candidates table:
+# (column, kind, source key, default)
+#   field       - copy candidate[source]
+#   first_value - the "value" of the first item in the candidate[source] list
+#   first       - the first item in the candidate[source] list
+#   json        - candidate[source] encoded as a JSON string
+CANDIDATE_COLUMNS: List[Tuple[str, str, str, Any]] = [
+    ("merge_id", "field", "id", ""),
+    ("remote_id", "field", "remote_id", ""),
+    ("first_name", "field", "first_name", ""),
+    ("last_name", "field", "last_name", ""),
+    ("company", "field", "company", ""),
+    ("title", "field", "title", ""),
+    ("email", "first_value", "email_addresses", ""),
+    ("phone", "first_value", "phone_numbers", ""),
+    ("location", "first", "locations", ""),
+    ("created_at", "field", "created_at", ""),
+    ("modified_at", "field", "modified_at", ""),
+    ("remote_created_at", "field", "remote_created_at", ""),
+    ("remote_updated_at", "field", "remote_updated_at", ""),
+    ("applications_json", "json", "applications", []),
+    ("attachments_json", "json", "attachments", []),
+    ("locations_json", "json", "locations", []),
+    ("phone_numbers_json", "json", "phone_numbers", []),
+    ("email_addresses_json", "json", "email_addresses", []),
+    ("urls_json", "json", "urls", []),
+    ("tags_json", "json", "tags", []),
+    ("field_mappings_json", "json", "field_mappings", {}),
+    ("remote_was_deleted", "field", "remote_was_deleted", False),
+]
+
+
+# Column kinds resolved to small ints once, so the row loop only does lookups
+_KINDS = {"field": 0, "first_value": 1, "first": 2, "json": 3}
+
+# Merge bumps modified_at on its own resyncs, so it is left out of the content hash
+HASH_EXCLUDED_COLUMNS = {"modified_at"}
+
+
+class RecordSpec:
+    """
+    A compiled column spec: maps raw Merge records of one model to table rows
+    """
+
+    def __init__(self, columns: List[Tuple[str, str, str, Any]]):
+        self.columns = columns
+        self.compiled: List[Tuple[str, str, Any, int]] = []
+        for column, kind, source, default in columns:
+            if kind not in _KINDS:
+                raise ValueError(f"Unknown column kind '{kind}' for column '{column}'")
+            self.compiled.append((column, source, default, _KINDS[kind]))
+        self.names = [column for column, _, _, _ in columns]
+        self.hash_columns = [column for column in self.names if column not in HASH_EXCLUDED_COLUMNS]
+        # Positions of each column in a compact row
+        self.index = {column: i for i, column in enumerate(self.names)}
+        self.hash_indexes = [self.index[column] for column in self.hash_columns]
+        # RowBatch.encode writes the plain columns as one JSON object, then
+        # splices the pre-encoded json columns in with body_template
+        self.json_indexes = [i for i, (_, _, _, kind) in enumerate(self.compiled) if kind == 3]
+        self.plain_indexes = [i for i, (_, _, _, kind) in enumerate(self.compiled) if kind != 3]
+        self.plain_names = [self.names[i] for i in self.plain_indexes]
+        self.body_template = b"%b" + b"".join(
+            b"," + encode_json_bytes(self.names[i]).replace(b"%", b"%%") + b':"%b"' for i in self.json_indexes
+        ) + b"}"
+
+
+CANDIDATE_SPEC = RecordSpec(CANDIDATE_COLUMNS)
+CANDIDATE_COLUMN_NAMES = CANDIDATE_SPEC.names
+
+
+def _convert(get: Callable[..., Any], source: str, default: Any, kind: int) -> Any:
+    if kind == 0:
+        return get(source, default)
+    if kind == 3:
+        return encode_json(get(source, default))
+    items = get(source)
+    if not items:
+        return default
+    return items[0].get("value", default) if kind == 1 else items[0]
+
+
+def transform_records(
+    records: List[Dict[str, Any]],
+    spec: RecordSpec,
+    columnar: bool = False,
+) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+    """
+    Transform a page of Merge records into Supabase-compatible rows in one pass
+
+    Args:
+        records (List[Dict[str, Any]]): Raw Merge records
+        spec (RecordSpec): Column spec for the records' model
+        columnar (bool, optional): Return a dict of column lists instead of a
+            list of row dicts. Defaults to False.
+
+    Returns:
+        Union[List[Dict[str, Any]], Dict[str, List[Any]]]: Rows ready for upsert
+    """
+    compiled = spec.compiled
+    encode = encode_json
+
+    if columnar:
+        columns: Dict[str, List[Any]] = {column: [] for column in spec.names}
+        appends = [(columns[column].append, source, default, kind) for column, source, default, kind in compiled]
+        for record in records:
+            get = record.get
+            for append, source, default, kind in appends:
+                if kind == 0:
+                    append(get(source, default))
+                elif kind == 3:
+                    append(encode(get(source, default)))
+                else:
+                    append(_convert(get, source, default, kind))
+        return columns
+
+    rows = []
+    append_row = rows.append
+    for record in records:
+        get = record.get
+        row = {}
+        for column, source, default, kind in compiled:
+            if kind == 0:
+                row[column] = get(source, default)
+            elif kind == 3:
+                row[column] = encode(get(source, default))
+            else:
+                row[column] = _convert(get, source, default, kind)
+        append_row(row)
+    return rows
+
+
+def transform_candidates(
+    candidates: List[Dict[str, Any]],
+    columnar: bool = False,
+) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+    """
+    Transform a page of Merge candidates into Supabase-compatible rows in one pass
+
+    See transform_records for arguments.
+    """
+    return transform_records(candidates, CANDIDATE_SPEC, columnar)
+
+
+# A compact row: one value per spec column, in spec order, with json columns
+# held as encoded UTF-8 bytes instead of str
+CompactRow = Tuple[Any, ...]
+
+
+def transform_compact(records: List[Dict[str, Any]], spec: RecordSpec) -> List[CompactRow]:
+    """
+    Transform a page of Merge records into compact rows
+
+    A tuple costs a fraction of a 20-odd key dict, and nested values are
+    encoded to JSON bytes once, here; RowBatch.encode copies them into the
+    upsert body as they are.
+
+    Args:
+        records (List[Dict[str, Any]]): Raw Merge records
+        spec (RecordSpec): Column spec for the records' model
+
+    Returns:
+        List[CompactRow]: One tuple per record, in spec column order
+    """
+    compiled = spec.compiled
+    encode = compact_json_bytes
+    rows = []
+    append_row = rows.append
+    for record in records:
+        get = record.get
+        append_row(tuple([
+            get(source, default) if kind == 0
+            else encode(get(source, default)) if kind == 3
+            else _convert(get, source, default, kind)
+            for _, source, default, kind in compiled
+        ]))
+    return rows
+
+
+class RowBatch:
+    """
+    Compact rows of one model, as passed from the sync transformer to the writers
+
+    Args:
+        spec (RecordSpec): Column spec the rows were built with
+        rows (List[CompactRow], optional): Rows from transform_compact
+    """
+
+    __slots__ = ("spec", "rows")
+
+    def __init__(self, spec: RecordSpec, rows: Optional[List[CompactRow]] = None):
+        self.spec = spec
+        self.rows = rows if rows is not None else []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[CompactRow]:
+        return iter(self.rows)
+
+    def column(self, name: str) -> List[Any]:
+        i = self.spec.index[name]
+        return [row[i] for row in self.rows]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Rows as transform_records would have returned them
+        """
+        names = self.spec.names
+        json_indexes = self.spec.json_indexes
+        dicts = []
+        for row in self.rows:
+            values = list(row)
+            for i in json_indexes:
+                values[i] = values[i].decode("utf-8")
+            dicts.append(dict(zip(names, values)))
+        return dicts
+
+    def encode(self) -> bytes:
+        """
+        Encode the rows as a JSON array for a PostgREST upsert
+
+        The *_json columns are text columns, so their pre-encoded bytes are
+        written as JSON strings. Encoded JSON has no raw control characters,
+        so only quotes and backslashes need escaping, and a NUL byte can
+        separate the values of the whole batch while they are escaped at once.
+        """
+        spec = self.spec
+        json_indexes = spec.json_indexes
+        plain_indexes = spec.plain_indexes
+        plain_names = spec.plain_names
+        template = spec.body_template
+        encode = encode_json_bytes
+        width = len(json_indexes)
+        escaped = b"\x00".join([row[i] for row in self.rows for i in json_indexes])
+        escaped = escaped.replace(b"\\", b"\\\\").replace(b'"', b'\\"').split(b"\x00") if width else []
+        parts = []
+        for n, row in enumerate(self.rows):
+            head = encode(dict(zip(plain_names, [row[i] for i in plain_indexes])))
+            parts.append(template % (head[:-1], *escaped[n * width:(n + 1) * width]))
+        return b"[" + b",".join(parts) + b"]"
+
+
+def content_hash(row: Dict[str, Any], spec: RecordSpec = CANDIDATE_SPEC) -> str:
+    """
+    Stable hash of a transformed row's content, used to skip no-op upserts
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for column in spec.hash_columns:
+        digest.update(str(row.get(column)).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def compact_content_hash(row: CompactRow, spec: RecordSpec = CANDIDATE_SPEC) -> str:
+    """
+    content_hash for a compact row; both give the same hash for the same record
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for i in spec.hash_indexes:
+        value = row[i]
+        digest.update(value if type(value) is bytes else str(value).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def columns_to_rows(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Convert columnar transformer output back into a list of row dicts
+    """
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
@@ -0,0 +1,269 @@
+import os
+import re
+import sys
+import uuid
+import queue
+import atexit
+import random
+import logging
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, Tuple
+
+from candidate_transform import encode_json
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one structured record per line, "text" for the classic format
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_REDACT = os.getenv("LOG_REDACT", "true").lower() in ("1", "true", "yes")
+# Per-route overrides by path prefix, e.g. "/health=WARNING,/merge-supabase=INFO"
+LOG_ROUTE_LEVELS = os.getenv("LOG_ROUTE_LEVELS", "/health=WARNING")
+# Share of requests whose DEBUG/INFO records are kept, by path prefix,
+# e.g. "/merge-supabase/fetch-candidates=0.1". Warnings and errors are never sampled out.
+LOG_ROUTE_SAMPLE_RATES = os.getenv("LOG_ROUTE_SAMPLE_RATES", "")
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# (pattern, replacement) pairs applied to formatted messages, in order
+REDACTIONS: List[Tuple["re.Pattern[str]", str]] = [
+    (re.compile(r"(?i)\bbearer\s+[\w.~+/=-]+"), "Bearer [token]"),
+    (re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]+"), "[token]"),
+    (
+        re.compile(
+            r"(?i)\b((?:account|public|link|access|refresh)[_-]?token|api[_-]?key|authorization|password|secret)"
+            r"(['\"]?\s*[:=]\s*['\"]?)[^\s'\",}&]+"
+        ),
+        r"\1\2[redacted]",
+    ),
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "[email]"),
+    # Formatted numbers ("+1 (555) 123-4567", "+44 20 7946 0958") and E.164 ("+15551234567");
+    # bare digit runs are left alone, since they are usually counts, ids or timestamps
+    (
+        re.compile(
+            r"(?<![\w.:-])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{3}\)\s?|\d{3}[\s.-])\d{3}[\s.-]\d{4}(?![\w-])"
+            r"|(?<![\w.:-])\+\d{1,3}(?:[\s.-]\d{2,4}){2,4}(?![\w-])"
+            r"|(?<![\w.:-])\+\d{8,15}(?![\w-])"
+        ),
+        "[phone]",
+    ),
+]
+
+
+def redact(text: str) -> str:
+    """
+    Mask tokens, email addresses and phone numbers in a log message
+    """
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _parse_route_setting(value: str) -> List[Tuple[str, str]]:
+    settings = []
+    for item in value.split(","):
+        prefix, _, setting = item.strip().partition("=")
+        if prefix and setting:
+            settings.append((prefix, setting.strip()))
+    # Longest prefix first, so the most specific route wins
+    return sorted(settings, key=lambda item: len(item[0]), reverse=True)
+
+
+class RouteLogContext:
+    """
+    Per-request logging decisions, made once when the request starts
+    """
+
+    __slots__ = ("route", "request_id", "level", "sampled")
+
+    def __init__(self, route: str, request_id: str, level: int, sampled: bool):
+        self.route = route
+        self.request_id = request_id
+        self.level = level
+        self.sampled = sampled
+
+
+_log_context: contextvars.ContextVar[Optional[RouteLogContext]] = contextvars.ContextVar("log_context", default=None)
+
+
+class RoutePolicy:
+    """
+    Resolves the log level and sample rate for a request path
+    """
+
+    def __init__(self, levels: str = LOG_ROUTE_LEVELS, sample_rates: str = LOG_ROUTE_SAMPLE_RATES):
+        self.levels = [
+            (prefix, logging.getLevelName(level.upper()))
+            for prefix, level in _parse_route_setting(levels)
+        ]
+        self.sample_rates = [(prefix, float(rate)) for prefix, rate in _parse_route_setting(sample_rates)]
+
+    def context_for(self, path: str) -> RouteLogContext:
+        level = next((level for prefix, level in self.levels if path.startswith(prefix)), logging.NOTSET)
+        rate = next((rate for prefix, rate in self.sample_rates if path.startswith(prefix)), 1.0)
+        return RouteLogContext(path, uuid.uuid4().hex[:12], level, rate >= 1.0 or random.random() < rate)
+
+
+class RouteFilter(logging.Filter):
+    """
+    Drops records below the current route's level (or the default level
+    outside requests and for routes without an override), and DEBUG/INFO
+    records of requests that were not sampled
+
+    Runs on the calling thread, so it only does attribute lookups; the record
+    is tagged with the route and request id for the formatter.
+    """
+
+    def __init__(self, default_level: int = logging.INFO):
+        super().__init__()
+        self.default_level = default_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        if context is None:
+            return record.levelno >= self.default_level
+        if record.levelno < (context.level or self.default_level):
+            return False
+        if not context.sampled and record.levelno < logging.WARNING:
+            return False
+        record.route = context.route
+        record.request_id = context.request_id
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler that defers all formatting to the listener thread
+
+    The stock QueueHandler formats the message before enqueueing it so the
+    record can be pickled; records here stay in-process, so the %-style
+    arguments are only rendered (and redacted) by the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, or as text, with redaction
+    """
+
+    def __init__(self, structured: bool = True, redact_messages: bool = LOG_REDACT):
+        super().__init__(TEXT_FORMAT)
+        self.structured = structured
+        self.redact_messages = redact_messages
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        if self.redact_messages:
+            message = redact(message)
+
+        if not self.structured:
+            record.message = message
+            record.asctime = self.formatTime(record)
+            return TEXT_FORMAT % vars(record)
+
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                if self.redact_messages and isinstance(value, str):
+                    value = redact(value)
+                entry[key] = value
+        return encode_json(entry)
+
+
+# The running listener, so setup_logging can be called again (e.g. per app)
+_listener: Optional[QueueListener] = None
+route_policy = RoutePolicy()
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    structured: bool = LOG_FORMAT == "json",
+    stream: Any = None,
+) -> QueueListener:
+    """
+    Route all logging through a queue to a background writer thread
+
+    Callers only pay for a level check, the route filter and a queue put;
+    formatting, redaction and I/O happen on the listener thread.
+
+    Args:
+        level (str, optional): Root log level. Defaults to LOG_LEVEL.
+        structured (bool, optional): Emit JSON lines instead of text. Defaults to LOG_FORMAT == "json".
+        stream (Any, optional): Output stream. Defaults to stderr.
+
+    Returns:
+        QueueListener: The started listener
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(StructuredFormatter(structured))
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = LazyQueueHandler(log_queue)
+    default_level = getattr(logging, level, logging.INFO)
+    handler.addFilter(RouteFilter(default_level))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    # The root level lets through the most verbose route override; the route
+    # filter holds everything else to the default level
+    root.setLevel(min([default_level, *(route_level for _, route_level in route_policy.levels)]))
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """
+    Flush queued records and stop the writer thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class LogContextMiddleware:
+    """
+    ASGI middleware that applies the per-route log level and sampling
+
+    The decision is stored in a context variable, so it also covers
+    background tasks (e.g. sync jobs) started while handling the request.
+    """
+
+    def __init__(self, app: Any, policy: RoutePolicy = route_policy):
+        self.app = app
+        self.policy = policy
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _log_context.set(self.policy.context_for(scope["path"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _log_context.reset(token)
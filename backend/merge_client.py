@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+import httpx
+from dotenv import load_dotenv
+from typing import Optional, Dict, Any
+
+from merge_scheduler import MergeScheduler
+from sync_state import account_key
+from metrics import MERGE_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Merge API configuration
+MERGE_API_KEY = os.getenv("MERGE_API_KEY")
+MERGE_API_BASE_URL = os.getenv("MERGE_API_BASE_URL", "https://api.merge.dev/api")
+
+# Connection pool configuration
+MERGE_MAX_CONNECTIONS = int(os.getenv("MERGE_MAX_CONNECTIONS", "100"))
+MERGE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MERGE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+MERGE_KEEPALIVE_EXPIRY = float(os.getenv("MERGE_KEEPALIVE_EXPIRY", "30.0"))
+MERGE_HTTP2 = os.getenv("MERGE_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Methods retried on 5xx and transport errors unless the caller says otherwise
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Per-endpoint timeouts, keyed by the name passed to MergeClient.request()
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+ENDPOINT_TIMEOUTS: Dict[str, httpx.Timeout] = {
+    "create-link-token": httpx.Timeout(30.0, connect=10.0),
+    "account-token": httpx.Timeout(15.0, connect=10.0),
+    "jobs": httpx.Timeout(30.0, connect=10.0),
+    "candidates": httpx.Timeout(60.0, connect=10.0),
+    "applications": httpx.Timeout(60.0, connect=10.0),
+    "interviews": httpx.Timeout(60.0, connect=10.0),
+    "offers": httpx.Timeout(30.0, connect=10.0),
+    "attachments": httpx.Timeout(30.0, connect=10.0),
+}
+
+
+class MergeAPIError(Exception):
+    """
+    Raised when the Merge API returns a non-200 response
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Merge API error ({status_code}): {message}")
+        self.status_code = status_code
+
+
+class MergeClient:
+    """
+    App-lifetime wrapper around a pooled httpx.AsyncClient for the Merge API
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = MERGE_API_BASE_URL,
+        max_connections: int = MERGE_MAX_CONNECTIONS,
+        max_keepalive_connections: int = MERGE_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = MERGE_KEEPALIVE_EXPIRY,
+        http2: bool = MERGE_HTTP2,
+    ):
+        self.api_key = api_key if api_key is not None else MERGE_API_KEY
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the h2 package is not installed, falling back to HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self.scheduler = MergeScheduler()
+        self._in_flight = 0
+        self._requests_total = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            limits=self.limits,
+            timeout=DEFAULT_TIMEOUT,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self) -> None:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def headers(self, account_token: Optional[str] = None) -> Dict[str, str]:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        if account_token:
+            headers["X-Account-Token"] = account_token
+        return headers
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        account_token: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Send a request to the Merge API over the shared connection pool
+
+        Requests go through the rate-limit scheduler, so throttled (429) and
+        5xx responses are retried with backoff before being returned. Requests
+        that are not idempotent (POST unless the caller says otherwise) are
+        only retried when throttled or when the connection failed.
+
+        Args:
+            method (str): HTTP method
+            path (str): Path relative to MERGE_API_BASE_URL, e.g. "/ats/v1/candidates"
+            account_token (str, optional): Linked account token sent as X-Account-Token
+            endpoint (str, optional): Key into ENDPOINT_TIMEOUTS. Defaults to DEFAULT_TIMEOUT.
+            idempotent (bool, optional): Whether the request is safe to repeat.
+                Defaults to True for GET, HEAD and OPTIONS.
+
+        Returns:
+            httpx.Response: The raw response
+        """
+        kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+        headers = self.headers(account_token)
+        headers.update(kwargs.pop("headers", None) or {})
+
+        async def send() -> httpx.Response:
+            self._in_flight += 1
+            self._requests_total += 1
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = await self.client.request(method, path, headers=headers, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                self._in_flight -= 1
+                MERGE_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint or "other", status=status)
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        return await self.scheduler.run(account_key(account_token) if account_token else "", send, idempotent=idempotent)
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Report connection pool usage (open, idle, active and waiting)
+        """
+        stats = {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "in_flight": self._in_flight,
+            "requests_total": self._requests_total,
+            "open": 0,
+            "idle": 0,
+            "active": 0,
+            "waiting": 0,
+        }
+        if self._client is None or self._client.is_closed:
+            return stats
+
+        # httpx does not expose pool state publicly, so read it from httpcore
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is None:
+            return stats
+        connections = pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats["open"] = len(connections)
+        stats["idle"] = idle
+        stats["active"] = len(connections) - idle
+        stats["waiting"] = sum(1 for request in getattr(pool, "_requests", []) if request.is_queued())
+        return stats
+
+
+# Shared instance, opened and closed by the lifespan hook in app.py
+merge_client = MergeClient()
+
+
+def get_merge_client() -> MergeClient:
+    return merge_client
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 import logging
 import asyncio
+import httpx
 from typing import Optional, Dict, Any, List
 
-from merge_supabase import get_candidates, sync_candidates_to_supabase
+from merge_client import MergeAPIError
+from candidate_transform import transform_candidates, encode_json, CANDIDATE_COLUMN_NAMES
+from merge_supabase import (
+    iter_candidate_pages, sync_candidates_to_supabase, sync_models_to_supabase,
+    reconcile_deleted_records, SYNC_UPSERT_CHUNK_SIZE, RECONCILE_BATCH_SIZE
+)
+from ats_models import MODEL_REGISTRY, dependency_order, get_model
+from sync_jobs import sync_jobs
+from search_index import search_indexes
+from response_cache import response_cache, cache_key
+from bulk_sync import load_linked_accounts, sync_many_accounts, BULK_SYNC_CONCURRENCY, BULK_SYNC_PER_TENANT
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -16,37 +27,198 @@ router = APIRouter(prefix="/merge-supabase", tags=["merge-supabase"])
 class SyncRequest(BaseModel):
     account_token: str
     table_name: Optional[str] = "candidates"
-    limit: Optional[int] = 100
-    offset: Optional[int] = 0
+    limit: int = Field(100, ge=1, le=1000)
+    # Merge pages by cursor only; the read routes reject a non-zero offset
+    offset: int = Field(0, ge=0)
+    # Cursor pagination: fetch-candidates and get-transformed-candidates return one
+    # page unless max_pages is set, sync-candidates follows the cursor to the end
+    cursor: Optional[str] = None
+    max_pages: Optional[int] = None
+    # Rows per Supabase upsert during sync
+    chunk_size: Optional[int] = None
+    # Ignore the stored watermark and resync every candidate
+    full: Optional[bool] = False
+    # Upsert rows even when their content hash has not changed
+    force: Optional[bool] = False
+    # Continue from the last checkpoint of an interrupted sync
+    resume: Optional[bool] = True
 
-@router.post("/fetch-candidates")
-async def fetch_candidates(request: SyncRequest):
+class BulkSyncRequest(BaseModel):
+    # Either an explicit list of account tokens, or a Supabase table to read them from
+    account_tokens: Optional[List[str]] = None
+    accounts_table: Optional[str] = None
+    token_column: Optional[str] = "account_token"
+    tenant_column: Optional[str] = "organization_id"
+    table_name: Optional[str] = "candidates"
+    max_concurrency: Optional[int] = None
+    per_tenant_limit: Optional[int] = None
+    limit: int = Field(100, ge=1, le=1000)
+    chunk_size: Optional[int] = None
+    full: Optional[bool] = False
+    force: Optional[bool] = False
+
+class ModelSyncRequest(BaseModel):
+    account_token: str
+    # Registry names to sync; defaults to every model
+    models: Optional[List[str]] = None
+    # Supabase table name overrides by model name
+    tables: Optional[Dict[str, str]] = None
+    limit: int = Field(100, ge=1, le=1000)
+    max_pages: Optional[int] = None
+    chunk_size: Optional[int] = None
+    full: Optional[bool] = False
+    force: Optional[bool] = False
+    resume: Optional[bool] = True
+
+class ReconcileRequest(BaseModel):
+    account_token: str
+    model: Optional[str] = "candidates"
+    table_name: Optional[str] = None
+    batch_size: Optional[int] = None
+    # Count tombstones without writing
+    dry_run: Optional[bool] = False
+
+class SearchRequest(BaseModel):
+    account_token: str
+    table_name: Optional[str] = "candidates"
+    # Words matched as prefixes against names, email, company, title and tags
+    q: Optional[str] = ""
+    # ISO-8601 bounds on remote_updated_at (exclusive)
+    updated_after: Optional[str] = None
+    updated_before: Optional[str] = None
+    limit: int = Field(20, ge=0, le=1000)
+    offset: int = Field(0, ge=0)
+
+def cached_response(http_request: Request, cached) -> Response:
     """
-    Fetch candidates from Merge ATS using the provided account token
+    Build a response for a cached body, or a 304 when the client's ETag still matches
+    """
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={int(response_cache.ttl)}"}
+    if_none_match = http_request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def offset_not_supported(request: SyncRequest) -> Optional[JSONResponse]:
+    """
+    A 400 for requests that page by offset, which Merge ignores; None otherwise
+    """
+    if not request.offset:
+        return None
+    return JSONResponse(
+        status_code=400,
+        content={"success": False, "message": "offset is not supported; page with the 'next' cursor instead"}
+    )
+
+async def load_candidate_pages(request: SyncRequest):
+    """
+    Fetch max_pages (default 1) pages of request.limit candidates from request.cursor
+    
+    Returns:
+        The candidates and the cursor for the page after them
+    """
+    candidates = []
+    next_cursor = None
+    async for page, next_cursor in iter_candidate_pages(
+        account_token=request.account_token,
+        page_size=request.limit,
+        max_pages=request.max_pages or 1,
+        cursor=request.cursor
+    ):
+        candidates.extend(page)
+    return candidates, next_cursor
+
+async def stream_candidates_ndjson(request: SyncRequest, transformed: bool):
     """
-    logger.info(f"Fetching candidates with account token ending in ...{request.account_token[-4:]}")
+    Yield candidates as NDJSON, one Merge page per chunk
     
+    The next page is only fetched once the previous chunk has been sent, so at
+    most one page is held in memory and slow clients apply backpressure.
+    Errors after the response has started are reported as a final error line.
+    """
     try:
-        candidates = await get_candidates(
+        async for page, _ in iter_candidate_pages(
             account_token=request.account_token,
-            limit=request.limit,
-            offset=request.offset
+            page_size=request.limit,
+            max_pages=request.max_pages,
+            cursor=request.cursor
+        ):
+            rows = transform_candidates(page) if transformed else page
+            if rows:
+                yield "".join(encode_json(row) + "\n" for row in rows)
+    except Exception as e:
+        logger.error("Error streaming candidates: %s", e)
+        yield encode_json({"success": False, "message": f"Error: {str(e)}"}) + "\n"
+
+@router.post("/fetch-candidates")
+async def fetch_candidates(request: SyncRequest, http_request: Request, stream: bool = False, transformed: bool = False):
+    """
+    Fetch candidates from Merge ATS using the provided account token
+    
+    Responses are cached briefly and carry an ETag for If-None-Match revalidation.
+    With ?stream=1 or Accept: application/x-ndjson, candidates are streamed as
+    NDJSON across all pages (up to max_pages) instead; ?transformed=1 streams
+    Supabase-ready rows instead of raw Merge records.
+    """
+    logger.info("Fetching candidates with account token ending in ...%s", request.account_token[-4:])
+    
+    # Merge pages by cursor only; silently ignoring an offset would return page 1 forever
+    rejected = offset_not_supported(request)
+    if rejected:
+        return rejected
+    
+    if stream or NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+        return StreamingResponse(
+            stream_candidates_ndjson(request, transformed),
+            media_type=NDJSON_MEDIA_TYPE
         )
+    
+    async def load():
+        candidates, next_cursor = await load_candidate_pages(request)
         
         if not candidates:
-            return JSONResponse(
-                status_code=404,
-                content={"success": False, "message": "No candidates found or error fetching data"}
-            )
+            return None
         
         return {
             "success": True,
             "count": len(candidates),
+            "next": next_cursor,
             "data": candidates
         }
+    
+    try:
+        key = cache_key(
+            request.account_token, "fetch-candidates",
+            limit=request.limit, cursor=request.cursor, max_pages=request.max_pages or 1
+        )
+        cached = await response_cache.get_or_load(key, load)
+        
+        if not cached:
+            return JSONResponse(
+                status_code=404,
+                content={"success": False, "message": "No candidates found or error fetching data"}
+            )
+        
+        return cached_response(http_request, cached)
         
+    except MergeAPIError as e:
+        logger.error("Error fetching candidates: %s", e)
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"success": False, "message": str(e)}
+        )
+    except httpx.TransportError as e:
+        # Merge could not be reached even after the scheduler's retries
+        logger.error("Error fetching candidates: Merge unreachable (%s)", type(e).__name__)
+        return JSONResponse(
+            status_code=502,
+            content={"success": False, "message": f"Merge API unreachable: {type(e).__name__}"}
+        )
     except Exception as e:
-        logger.error(f"Error fetching candidates: {str(e)}")
+        logger.error("Error fetching candidates: %s", e)
         return JSONResponse(
             status_code=500,
             content={"success": False, "message": f"Error: {str(e)}"}
@@ -55,105 +227,334 @@ async def fetch_candidates(request: SyncRequest):
 @router.post("/sync-candidates")
 async def sync_candidates(request: SyncRequest):
     """
-    Sync candidates from Merge ATS to Supabase
+    Start a background sync of candidates from Merge ATS to Supabase
+    
+    Returns a job ID immediately; poll GET /merge-supabase/jobs/{job_id} for progress.
     """
-    logger.info(f"Syncing candidates to Supabase table {request.table_name}")
+    logger.info("Syncing candidates to Supabase table %s", request.table_name)
+    
+    async def run(on_progress):
+        return await sync_candidates_to_supabase(
+            account_token=request.account_token,
+            table_name=request.table_name,
+            page_size=request.limit,
+            max_pages=request.max_pages,
+            chunk_size=request.chunk_size or SYNC_UPSERT_CHUNK_SIZE,
+            full=bool(request.full),
+            force=bool(request.force),
+            resume=request.resume is not False,
+            on_progress=on_progress
+        )
     
     try:
-        result = await sync_candidates_to_supabase(
+        job = sync_jobs.submit(request.account_token, request.table_name, run)
+    except ValueError as e:
+        existing = sync_jobs.active_job(request.account_token)
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "message": str(e), "job_id": existing.id if existing else None}
+        )
+    except Exception as e:
+        logger.error("Error syncing candidates: %s", e)
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": f"Error: {str(e)}"}
+        )
+    
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "job_id": job.id, "status": job.status}
+    )
+
+@router.get("/models")
+async def list_models():
+    """
+    List the Merge ATS models the sync engine can copy, in dependency order
+    """
+    return {
+        "success": True,
+        "models": [
+            {
+                "name": model.name,
+                "path": model.path,
+                "table_name": model.table_name,
+                "conflict_key": model.conflict_key,
+                "depends_on": list(model.depends_on),
+                "columns": model.column_names,
+            }
+            for model in MODEL_REGISTRY.values()
+        ]
+    }
+
+@router.post("/sync")
+async def sync_models(request: ModelSyncRequest):
+    """
+    Start a background sync of several Merge ATS models to Supabase
+    
+    Independent models sync concurrently and dependent models wait for their
+    parents. Returns a job ID immediately; poll GET /merge-supabase/jobs/{job_id}
+    for progress and per-model results.
+    """
+    try:
+        models = dependency_order(request.models)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    
+    logger.info("Syncing %s to Supabase", ", ".join(model.name for model in models))
+    
+    async def run(on_progress):
+        return await sync_models_to_supabase(
             account_token=request.account_token,
-            table_name=request.table_name
+            models=[model.name for model in models],
+            tables=request.tables,
+            on_progress=on_progress,
+            page_size=request.limit,
+            max_pages=request.max_pages,
+            chunk_size=request.chunk_size or SYNC_UPSERT_CHUNK_SIZE,
+            full=bool(request.full),
+            force=bool(request.force),
+            resume=request.resume is not False
         )
-        
-        if not result.get("success", False):
-            return JSONResponse(
-                status_code=400,
-                content=result
+    
+    try:
+        job = sync_jobs.submit(request.account_token, "+".join(model.name for model in models), run)
+    except ValueError as e:
+        existing = sync_jobs.active_job(request.account_token)
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "message": str(e), "job_id": existing.id if existing else None}
+        )
+    except Exception as e:
+        logger.error("Error syncing models: %s", e)
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": f"Error: {str(e)}"}
+        )
+    
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "job_id": job.id, "status": job.status}
+    )
+
+@router.post("/reconcile")
+async def reconcile_deleted(request: ReconcileRequest):
+    """
+    Start a background run that soft-deletes rows whose Merge records are gone
+    
+    Returns a job ID immediately; poll GET /merge-supabase/jobs/{job_id} for the result.
+    """
+    try:
+        model = get_model(request.model)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    
+    table_name = request.table_name or model.table_name
+    logger.info("Reconciling deleted %s in Supabase table %s", model.name, table_name)
+    
+    async def run(on_progress):
+        return await reconcile_deleted_records(
+            account_token=request.account_token,
+            model=model,
+            table_name=table_name,
+            batch_size=request.batch_size or RECONCILE_BATCH_SIZE,
+            dry_run=bool(request.dry_run),
+            on_progress=on_progress
+        )
+    
+    try:
+        job = sync_jobs.submit(request.account_token, table_name, run)
+    except ValueError as e:
+        existing = sync_jobs.active_job(request.account_token)
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "message": str(e), "job_id": existing.id if existing else None}
+        )
+    except Exception as e:
+        logger.error("Error reconciling %s: %s", model.name, e)
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": f"Error: {str(e)}"}
+        )
+    
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "job_id": job.id, "status": job.status}
+    )
+
+@router.post("/sync-candidates/bulk")
+async def bulk_sync_candidates(request: BulkSyncRequest):
+    """
+    Start a background sync of candidates for many linked accounts concurrently
+    
+    Returns a parent job ID immediately. Each account syncs as a child job;
+    GET /merge-supabase/jobs/{job_id} on the parent lists the children while
+    it runs and has the per-account results once it finishes.
+    """
+    if not request.account_tokens and not request.accounts_table:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": "Provide account_tokens or accounts_table"}
+        )
+    
+    async def run(on_progress):
+        if request.account_tokens:
+            accounts = [{"account_token": token, "tenant": None} for token in request.account_tokens]
+        else:
+            accounts = await load_linked_accounts(
+                table_name=request.accounts_table,
+                token_column=request.token_column,
+                tenant_column=request.tenant_column
             )
         
-        return result
+        logger.info("Bulk syncing %d accounts to Supabase table %s", len(accounts), request.table_name)
         
+        return await sync_many_accounts(
+            accounts,
+            table_name=request.table_name,
+            max_concurrency=request.max_concurrency or BULK_SYNC_CONCURRENCY,
+            per_tenant_limit=request.per_tenant_limit or BULK_SYNC_PER_TENANT,
+            # The task only starts once this handler returns, so job is set by then
+            parent=job,
+            page_size=request.limit,
+            chunk_size=request.chunk_size or SYNC_UPSERT_CHUNK_SIZE,
+            full=bool(request.full),
+            force=bool(request.force)
+        )
+    
+    try:
+        job = sync_jobs.submit(None, request.table_name, run)
     except Exception as e:
-        logger.error(f"Error syncing candidates: {str(e)}")
+        logger.error("Error bulk syncing candidates: %s", e)
         return JSONResponse(
             status_code=500,
             content={"success": False, "message": f"Error: {str(e)}"}
         )
+    
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "job_id": job.id, "status": job.status}
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_sync_job(job_id: str):
+    """
+    Get the status and progress of a background sync job
+    """
+    job = sync_jobs.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"success": False, "message": "Job not found"})
+    
+    return {"success": True, **job.to_dict()}
+
+@router.delete("/jobs/{job_id}")
+async def cancel_sync_job(job_id: str):
+    """
+    Cancel a queued or running sync job
+    
+    Waits briefly for the job to stop; the status is "cancelled" once it has,
+    or "cancelling" if it is still winding down.
+    """
+    job = await sync_jobs.cancel(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"success": False, "message": "Job not found"})
+    
+    return {"success": True, "job_id": job.id, "status": job.status}
 
 @router.post("/get-transformed-candidates")
-async def get_transformed_candidates(request: SyncRequest):
+async def get_transformed_candidates(request: SyncRequest, http_request: Request):
     """
     Get transformed candidates ready for Supabase insertion
+    
+    Pages like fetch-candidates: limit is the page size and cursor (from the
+    previous response's "next") selects the page.
     """
-    logger.info(f"Getting transformed candidates for account token ending in ...{request.account_token[-4:]}")
+    logger.info("Getting transformed candidates for account token ending in ...%s", request.account_token[-4:])
     
-    try:
-        from merge_supabase import get_candidates, json
-        
+    rejected = offset_not_supported(request)
+    if rejected:
+        return rejected
+    
+    async def load():
         # Fetch candidates from Merge
-        candidates = await get_candidates(
-            account_token=request.account_token,
-            limit=request.limit,
-            offset=request.offset
-        )
+        candidates, next_cursor = await load_candidate_pages(request)
         
         if not candidates:
-            return JSONResponse(
-                status_code=404,
-                content={"success": False, "message": "No candidates found or error fetching data"}
-            )
-            
-        # Transform candidates to make them Supabase-compatible
-        transformed_candidates = []
-        for candidate in candidates:
-            # Format complex fields as JSON strings
-            applications = json.dumps(candidate.get("applications", []))
-            attachments = json.dumps(candidate.get("attachments", []))
-            locations = json.dumps(candidate.get("locations", []))
-            phone_numbers = json.dumps(candidate.get("phone_numbers", []))
-            email_addresses = json.dumps(candidate.get("email_addresses", []))
-            urls = json.dumps(candidate.get("urls", []))
-            tags = json.dumps(candidate.get("tags", []))
-            field_mappings = json.dumps(candidate.get("field_mappings", {}))
-            
-            # Add a merged_id field to use as a primary key
-            transformed_candidate = {
-                "merge_id": candidate.get("id", ""),
-                "remote_id": candidate.get("remote_id", ""),
-                "first_name": candidate.get("first_name", ""),
-                "last_name": candidate.get("last_name", ""),
-                "company": candidate.get("company", ""),
-                "title": candidate.get("title", ""),
-                "email": candidate.get("email_addresses", [{}])[0].get("value", "") if candidate.get("email_addresses") else "",
-                "phone": candidate.get("phone_numbers", [{}])[0].get("value", "") if candidate.get("phone_numbers") else "",
-                "location": candidate.get("locations", [""])[0] if candidate.get("locations") else "",
-                "created_at": candidate.get("created_at", ""),
-                "modified_at": candidate.get("modified_at", ""),
-                "remote_created_at": candidate.get("remote_created_at", ""),
-                "remote_updated_at": candidate.get("remote_updated_at", ""),
-                "applications_json": applications,
-                "attachments_json": attachments,
-                "locations_json": locations,
-                "phone_numbers_json": phone_numbers,
-                "email_addresses_json": email_addresses,
-                "urls_json": urls,
-                "tags_json": tags,
-                "field_mappings_json": field_mappings,
-                "remote_was_deleted": candidate.get("remote_was_deleted", False),
-            }
-            transformed_candidates.append(transformed_candidate)
+            return None
+        
+        # Only the first 5 rows are returned, so only those are transformed
+        transformed_candidates = transform_candidates(candidates[:5])
         
         # Return transformed candidates
         return {
             "success": True,
-            "count": len(transformed_candidates),
-            "table_structure": list(transformed_candidates[0].keys()) if transformed_candidates else [],
-            "data": transformed_candidates[:5]  # Return only first 5 to keep response size manageable
+            "count": len(candidates),
+            "next": next_cursor,
+            "table_structure": CANDIDATE_COLUMN_NAMES,
+            "data": transformed_candidates  # Return only first 5 to keep response size manageable
         }
+    
+    try:
+        key = cache_key(
+            request.account_token, "get-transformed-candidates",
+            limit=request.limit, cursor=request.cursor, max_pages=request.max_pages or 1
+        )
+        cached = await response_cache.get_or_load(key, load)
         
+        if not cached:
+            return JSONResponse(
+                status_code=404,
+                content={"success": False, "message": "No candidates found or error fetching data"}
+            )
+        
+        return cached_response(http_request, cached)
+        
+    except MergeAPIError as e:
+        logger.error("Error transforming candidates: %s", e)
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"success": False, "message": str(e)}
+        )
+    except httpx.TransportError as e:
+        # Merge could not be reached even after the scheduler's retries
+        logger.error("Error transforming candidates: Merge unreachable (%s)", type(e).__name__)
+        return JSONResponse(
+            status_code=502,
+            content={"success": False, "message": f"Merge API unreachable: {type(e).__name__}"}
+        )
+    except Exception as e:
+        logger.error("Error transforming candidates: %s", e)
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": f"Error: {str(e)}"}
+        ) 
+
+@router.post("/search")
+async def search_candidates(request: SearchRequest):
+    """
+    Search synced candidates in the local index, without calling Supabase or Merge
+    
+    The index is filled by syncs in this process. "complete" is false until a
+    full sync has run since startup (or when the index hit SEARCH_INDEX_MAX_BYTES),
+    in which case results may be missing candidates.
+    """
+    if not search_indexes.enabled:
+        return JSONResponse(status_code=404, content={"success": False, "message": "Search index is disabled"})
+    
+    try:
+        result = await asyncio.to_thread(
+            search_indexes.search,
+            request.account_token,
+            request.table_name,
+            request.q or "",
+            updated_after=request.updated_after,
+            updated_before=request.updated_before,
+            limit=request.limit,
+            offset=request.offset,
+        )
+        return {"success": True, **result}
     except Exception as e:
-        logger.error(f"Error transforming candidates: {str(e)}")
+        logger.error("Error searching candidates: %s", e)
         return JSONResponse(
             status_code=500,
             content={"success": False, "message": f"Error: {str(e)}"}
-        ) 
\ No newline at end of file
+        )
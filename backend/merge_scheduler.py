@@ -0,0 +1,275 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import httpx
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import MERGE_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Rate limiting configuration (per account token)
+MERGE_RATE_PER_SECOND = float(os.getenv("MERGE_RATE_PER_SECOND", "10"))
+MERGE_RATE_BURST = float(os.getenv("MERGE_RATE_BURST", "20"))
+MERGE_ACCOUNT_CONCURRENCY = int(os.getenv("MERGE_ACCOUNT_CONCURRENCY", "4"))
+MERGE_ACCOUNT_MAX_CONCURRENCY = int(os.getenv("MERGE_ACCOUNT_MAX_CONCURRENCY", "16"))
+
+# Retry configuration
+MERGE_MAX_RETRIES = int(os.getenv("MERGE_MAX_RETRIES", "5"))
+MERGE_BACKOFF_BASE = float(os.getenv("MERGE_BACKOFF_BASE", "0.5"))
+MERGE_BACKOFF_MAX = float(os.getenv("MERGE_BACKOFF_MAX", "30"))
+
+# Per-account state kept for at most this many accounts
+MERGE_SCHEDULER_MAX_ACCOUNTS = int(os.getenv("MERGE_SCHEDULER_MAX_ACCOUNTS", "10000"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# A request that is not idempotent may already have been applied after a 5xx
+# or a read error, so it is only retried when Merge cannot have acted on it
+UNSENT_RETRY_STATUS_CODES = {429}
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _header(response: httpx.Response, name: str) -> Optional[float]:
+    # Merge has used both the IETF draft names and the older X- prefixed ones
+    value = response.headers.get(name) or response.headers.get(f"x-{name}")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """
+    Seconds to wait according to Retry-After or the rate-limit reset header
+    """
+    retry_after = _header(response, "retry-after")
+    if retry_after is not None:
+        return max(retry_after, 0.0)
+    reset = _header(response, "ratelimit-reset")
+    if reset is None:
+        return None
+    # Reset may be an epoch timestamp or a number of seconds
+    return max(reset - time.time(), 0.0) if reset > 1e9 else max(reset, 0.0)
+
+
+class TokenBucket:
+    """
+    Async token bucket; acquire() waits until a token is available
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.max_rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()
+        self.rate = max(min(rate, self.max_rate), 0.1)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: grows by one on healthy responses, halves when throttled
+    """
+
+    def __init__(self, limit: int, max_limit: int):
+        self.limit = limit
+        self.max_limit = max_limit
+        self.active = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    async def increase(self) -> None:
+        if self.limit < self.max_limit:
+            async with self._cond:
+                self.limit += 1
+                self._cond.notify_all()
+
+    def decrease(self) -> None:
+        self.limit = max(1, self.limit // 2)
+
+
+class AccountState:
+    def __init__(self):
+        self.bucket = TokenBucket(MERGE_RATE_PER_SECOND, MERGE_RATE_BURST)
+        self.limiter = AdaptiveLimiter(MERGE_ACCOUNT_CONCURRENCY, MERGE_ACCOUNT_MAX_CONCURRENCY)
+        self.queued = 0
+
+
+class MergeScheduler:
+    """
+    Central gate for Merge API requests
+
+    Each account token gets its own token bucket and adaptive concurrency
+    limit. Rate-limit headers tune both, and 429/5xx responses and transport
+    errors are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self, max_retries: int = MERGE_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._accounts: "OrderedDict[str, AccountState]" = OrderedDict()
+        self.requests_total = 0
+        self.throttled_total = 0
+        self.retried_total = 0
+        self.failed_total = 0
+
+    def _account(self, key: str) -> AccountState:
+        state = self._accounts.get(key)
+        if state is None:
+            state = self._accounts[key] = AccountState()
+            if len(self._accounts) > MERGE_SCHEDULER_MAX_ACCOUNTS:
+                for old_key in list(self._accounts):
+                    old = self._accounts[old_key]
+                    if old is not state and not old.queued and not old.limiter.active:
+                        del self._accounts[old_key]
+                        break
+        else:
+            self._accounts.move_to_end(key)
+        return state
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        delay = retry_after_seconds(response) if response is not None else None
+        if delay is not None:
+            return min(delay, MERGE_BACKOFF_MAX)
+        return random.uniform(0, min(MERGE_BACKOFF_MAX, MERGE_BACKOFF_BASE * (2 ** attempt)))
+
+    async def _observe(self, state: AccountState, response: httpx.Response) -> None:
+        if response.status_code == 429:
+            self.throttled_total += 1
+            state.limiter.decrease()
+            state.bucket.set_rate(state.bucket.rate / 2)
+            wait = retry_after_seconds(response)
+            if wait:
+                state.bucket.pause(wait)
+            return
+
+        remaining = _header(response, "ratelimit-remaining")
+        if remaining is None:
+            if response.status_code < 500:
+                await state.limiter.increase()
+            return
+
+        reset = retry_after_seconds(response)
+        limit = _header(response, "ratelimit-limit")
+        low = bool(limit) and remaining < limit * 0.2
+        if remaining <= 0 and reset:
+            state.bucket.pause(reset)
+        elif low and reset:
+            # Spread what is left of the budget over the rest of the window
+            state.bucket.set_rate(remaining / max(reset, 1.0))
+        else:
+            # Recover additively after a slowdown
+            state.bucket.set_rate(state.bucket.rate + state.bucket.max_rate * 0.1)
+
+        if low or remaining <= 0:
+            state.limiter.decrease()
+        elif response.status_code < 500:
+            await state.limiter.increase()
+
+    async def run(
+        self,
+        key: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        idempotent: bool = True,
+    ) -> httpx.Response:
+        """
+        Send a request through the account's rate limiter, retrying when throttled
+
+        Args:
+            key (str): Rate-limit key, normally a hash of the account token
+            send (Callable): Coroutine function that performs one attempt
+            idempotent (bool, optional): Whether the request is safe to repeat.
+                Requests that are not are only retried on a 429 or when the
+                connection could not be made. Defaults to True.
+
+        Returns:
+            httpx.Response: The final response; 429/5xx are returned once retries run out
+        """
+        state = self._account(key)
+        attempt = 0
+        retry_errors = httpx.TransportError if idempotent else UNSENT_ERRORS
+        retry_statuses = RETRY_STATUS_CODES if idempotent else UNSENT_RETRY_STATUS_CODES
+
+        while True:
+            state.queued += 1
+            try:
+                await state.limiter.acquire()
+            finally:
+                state.queued -= 1
+            try:
+                await state.bucket.acquire()
+                self.requests_total += 1
+                response = await send()
+            except retry_errors as e:
+                if attempt >= self.max_retries:
+                    self.failed_total += 1
+                    raise
+                logger.warning("Merge request failed (%s), retrying", type(e).__name__)
+                response = None
+            finally:
+                await state.limiter.release()
+
+            if response is not None:
+                await self._observe(state, response)
+                if response.status_code not in retry_statuses:
+                    return response
+                if attempt >= self.max_retries:
+                    self.failed_total += 1
+                    return response
+
+            delay = self._backoff(attempt, response)
+            attempt += 1
+            self.retried_total += 1
+            status = response.status_code if response is not None else "error"
+            MERGE_RETRIES.inc(reason=status)
+            logger.warning("Merge request returned %s, retry %d/%d in %.2fs", status, attempt, self.max_retries, delay)
+            await asyncio.sleep(delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests_total": self.requests_total,
+            "throttled_total": self.throttled_total,
+            "retried_total": self.retried_total,
+            "failed_total": self.failed_total,
+            "queued": sum(state.queued for state in self._accounts.values()),
+            "in_flight": sum(state.limiter.active for state in self._accounts.values()),
+            "accounts": len(self._accounts),
+        }
@@ -1,36 +1,68 @@
 import os
-import httpx
 import logging
-import json
-from dotenv import load_dotenv
-from supabase import create_client, Client
-from typing import Dict, List, Optional, Any
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+import time
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, List, Optional, Any, Tuple, Union
+
+from merge_client import merge_client, MergeAPIError
+from candidate_transform import (
+    CompactRow, RowBatch, transform_records, transform_compact, content_hash, compact_content_hash
+)
+from ats_models import MergeModel, CANDIDATES, dependency_order
+from sync_state import sync_state, parse_timestamp
+from search_index import search_indexes
+from response_cache import response_cache
+from metrics import (
+    SUPABASE_UPSERT_SECONDS, SUPABASE_UPSERT_BATCH_ROWS, SYNC_TRANSFORM_SECONDS, SYNC_ROWS_FETCHED, SYNC_ROWS_WRITTEN
 )
-logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
 
 # Merge API configuration
 MERGE_API_KEY = os.getenv("MERGE_API_KEY")
-MERGE_API_BASE_URL = "https://api.merge.dev/api"
+MERGE_API_BASE_URL = merge_client.base_url
 
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    logger.info("Supabase client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Supabase client: {str(e)}")
-    supabase = None
+# Merge caps page_size at 100
+MERGE_MAX_PAGE_SIZE = 100
+
+# Sync pipeline configuration
+SYNC_QUEUE_SIZE = int(os.getenv("SYNC_QUEUE_SIZE", "4"))
+SYNC_UPSERT_CHUNK_SIZE = int(os.getenv("SYNC_UPSERT_CHUNK_SIZE", "500"))
+SYNC_WRITE_CONCURRENCY = int(os.getenv("SYNC_WRITE_CONCURRENCY", "2"))
+
+# Deleted-record reconciliation: rows per soft-delete update, and the share of
+# an account's snapshot that may be tombstoned in one run before it is treated
+# as a bad Merge response instead
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "500"))
+RECONCILE_MAX_DELETE_FRACTION = float(os.getenv("RECONCILE_MAX_DELETE_FRACTION", "0.5"))
+
+# Supabase client, created on first use: importing supabase-py is a large share
+# of cold-start time, and the app should start even without Supabase settings
+_supabase: Optional["Client"] = None
+
+def get_supabase() -> Optional["Client"]:
+    """
+    Return the shared Supabase client, creating it on first use
+    
+    Returns:
+        Optional[Client]: The client, or None if it could not be initialized
+    """
+    global _supabase
+    if _supabase is None:
+        try:
+            from supabase import create_client
+            _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+            logger.info("Supabase client initialized successfully")
+        except Exception as e:
+            logger.error("Failed to initialize Supabase client: %s", e)
+    return _supabase
 
 async def get_candidates(account_token: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
     """
@@ -43,127 +75,785 @@ async def get_candidates(account_token: str, limit: int = 100, offset: int = 0)
         
     Returns:
         List[Dict[str, Any]]: List of candidate records
+    
+    Raises:
+        MergeAPIError: If Merge returns a non-200 response after retries
+        httpx.TransportError: If Merge could not be reached after retries
     """
-    logger.info(f"Fetching candidates with limit {limit}, offset {offset}")
+    logger.info("Fetching candidates with limit %s, offset %s", limit, offset)
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{MERGE_API_BASE_URL}/ats/v1/candidates",
-                headers={
-                    "Authorization": f"Bearer {MERGE_API_KEY}",
-                    "X-Account-Token": account_token,
-                    "Content-Type": "application/json",
-                },
-                params={
-                    "limit": limit,
-                    "offset": offset
-                }
-            )
-            
-            if response.status_code != 200:
-                error_message = f"Merge API error: {response.text}"
-                logger.error(error_message)
-                return []
-            
-            data = response.json()
-            logger.info(f"Successfully fetched {len(data.get('results', []))} candidates")
-            return data.get("results", [])
+        response = await merge_client.get(
+            "/ats/v1/candidates",
+            account_token=account_token,
+            endpoint="candidates",
+            params={
+                "limit": limit,
+                "offset": offset
+            }
+        )
+        
+        if response.status_code != 200:
+            error_message = f"Merge API error: {response.text}"
+            logger.error(error_message)
+            raise MergeAPIError(response.status_code, response.text)
+        
+        data = response.json()
+        logger.info("Successfully fetched %d candidates", len(data.get("results", [])))
+        return data.get("results", [])
             
     except Exception as e:
-        logger.error(f"Error fetching candidates: {str(e)}")
-        return []
+        # Raised rather than returned as an empty list, so outages are not reported as "no candidates"
+        logger.error("Error fetching candidates: %s", e)
+        raise
+
+async def iter_merge_pages(
+    account_token: str,
+    path: str,
+    endpoint: Optional[str] = None,
+    page_size: int = MERGE_MAX_PAGE_SIZE,
+    max_pages: Optional[int] = None,
+    cursor: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """
+    Follow Merge's cursor pagination for a list endpoint, one page at a time
+    
+    Only the current page is held in memory, so callers can stream through
+    tenants of any size.
+    
+    Args:
+        account_token (str): The Merge account token
+        path (str): List endpoint path, e.g. "/ats/v1/candidates"
+        endpoint (str, optional): Timeout key passed to the Merge client
+        page_size (int, optional): Records per page, capped at 100. Defaults to 100.
+        max_pages (int, optional): Stop after this many pages. Defaults to no limit.
+        cursor (str, optional): Cursor to resume from. Defaults to the first page.
+        params (Dict[str, Any], optional): Extra query parameters
+        
+    Yields:
+        Tuple[List[Dict[str, Any]], Optional[str]]: The page's records and the
+        cursor for the next page (None on the last page)
+    
+    Raises:
+        MergeAPIError: If Merge returns a non-200 response
+    """
+    page_size = max(1, min(page_size, MERGE_MAX_PAGE_SIZE))
+    pages = 0
+    
+    while max_pages is None or pages < max_pages:
+        query = dict(params or {})
+        query["page_size"] = page_size
+        if cursor:
+            query["cursor"] = cursor
+        
+        response = await merge_client.get(
+            path,
+            account_token=account_token,
+            endpoint=endpoint,
+            params=query
+        )
+        
+        if response.status_code != 200:
+            logger.error("Merge API error on %s: %s", path, response.text)
+            raise MergeAPIError(response.status_code, response.text)
+        
+        data = response.json()
+        results = data.get("results", [])
+        cursor = data.get("next")
+        pages += 1
+        logger.debug("Fetched page %d from %s (%d records)", pages, path, len(results))
+        
+        yield results, cursor
+        
+        if not cursor:
+            break
+
+async def iter_candidate_pages(
+    account_token: str,
+    page_size: int = MERGE_MAX_PAGE_SIZE,
+    max_pages: Optional[int] = None,
+    cursor: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """
+    Stream candidates from the Merge ATS API page by page
+    
+    See iter_merge_pages for arguments.
+    """
+    async for page in iter_merge_pages(
+        account_token,
+        CANDIDATES.path,
+        endpoint=CANDIDATES.endpoint,
+        page_size=page_size,
+        max_pages=max_pages,
+        cursor=cursor,
+        params=params,
+    ):
+        yield page
+
+def _upsert_batch(supabase: "Client", table_name: str, batch: RowBatch, on_conflict: str) -> Any:
+    """
+    POST a RowBatch's pre-encoded body to PostgREST, as supabase-py's upsert would
+    
+    The rows are not re-serialized, and return=minimal skips echoing them back.
+    """
+    from postgrest.exceptions import APIError
+    
+    response = supabase.postgrest.session.post(
+        table_name,
+        content=batch.encode(),
+        params={"on_conflict": on_conflict, "columns": ",".join(f'"{name}"' for name in batch.spec.names)},
+        headers={"Content-Type": "application/json", "Prefer": "return=minimal,resolution=merge-duplicates"},
+    )
+    if not response.is_success:
+        try:
+            error = response.json()
+        except ValueError:
+            error = {"message": response.text, "code": str(response.status_code)}
+        raise APIError(error if isinstance(error, dict) else {"message": str(error)})
+    return response
+
+async def upsert_rows(
+    table_name: str,
+    rows: Union[List[Dict[str, Any]], RowBatch],
+    on_conflict: str = "merge_id",
+) -> Any:
+    """
+    Upsert rows into Supabase without blocking the event loop
+    
+    The Supabase client is synchronous, so the request runs in a worker thread.
+    A RowBatch is sent as its pre-encoded body; row dicts go through supabase-py.
+    """
+    supabase = get_supabase()
+    SUPABASE_UPSERT_BATCH_ROWS.observe(len(rows), table=table_name)
+    with SUPABASE_UPSERT_SECONDS.time(table=table_name):
+        if isinstance(rows, RowBatch):
+            return await asyncio.to_thread(_upsert_batch, supabase, table_name, rows, on_conflict)
+        return await asyncio.to_thread(
+            lambda: supabase.table(table_name).upsert(rows, on_conflict=on_conflict).execute()
+        )
+
+async def soft_delete_rows(table_name: str, merge_ids: List[str], key: str = "merge_id") -> Any:
+    """
+    Flag rows as deleted upstream with a single batched update
+    """
+    supabase = get_supabase()
+    return await asyncio.to_thread(
+        lambda: supabase.table(table_name).update({"remote_was_deleted": True}).in_(key, merge_ids).execute()
+    )
+
+async def index_search_rows(account_token: str, table_name: str, batch: RowBatch) -> None:
+    """
+    Add synced rows to the search index, off the event loop, when search is enabled
+    """
+    if search_indexes.enabled and batch:
+        await asyncio.to_thread(search_indexes.index_rows, account_token, table_name, batch)
+
+async def remove_search_rows(account_token: str, table_name: str, merge_ids: List[str]) -> None:
+    """
+    Drop rows from the search index, off the event loop, when search is enabled
+    """
+    if search_indexes.enabled and merge_ids:
+        await asyncio.to_thread(search_indexes.remove, account_token, table_name, merge_ids)
+
+def _stage_throughput(stage: Dict[str, float]) -> float:
+    return round(stage["rows"] / stage["seconds"], 1) if stage["seconds"] else 0.0
+
+async def sync_model_to_supabase(
+    account_token: str,
+    model: MergeModel,
+    table_name: Optional[str] = None,
+    page_size: int = MERGE_MAX_PAGE_SIZE,
+    max_pages: Optional[int] = None,
+    chunk_size: int = SYNC_UPSERT_CHUNK_SIZE,
+    queue_size: int = SYNC_QUEUE_SIZE,
+    write_concurrency: int = SYNC_WRITE_CONCURRENCY,
+    full: bool = False,
+    force: bool = False,
+    resume: bool = True,
+    include_deleted: bool = True,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch one Merge ATS model and sync it to Supabase
+    
+    Runs as a pipeline: a fetcher streams Merge pages into a bounded queue, a
+    transformer turns them into rows and cuts them into upsert chunks, and
+    writers upsert the chunks concurrently. The bounded queues keep memory
+    flat and apply backpressure when Supabase is slower than Merge.
+    
+    Syncs are incremental by default: the latest modified_at seen by the last
+    complete run is stored per account and table, and only records
+    modified after it are fetched and upserted.
+    
+    Each row's content hash is compared with the hash last written for its
+    merge_id (kept in the local sync state), and unchanged rows are skipped.
+    
+    After every committed chunk the sync checkpoints the cursor of the first
+    page that is not yet fully written. A sync that crashes or is cancelled
+    resumes from that checkpoint on its next run; rows past it that were
+    already written are skipped by their content hash.
+    
+    Records Merge has flagged as deleted are requested too (include_deleted_data),
+    so soft deletes arrive as ordinary changed rows with remote_was_deleted set.
+    Every written merge_id is added to the account's snapshot, which
+    reconcile_deleted_records uses to find records that vanished outright.
+    
+    Candidate rows also update the account's local search index: written
+    rows once their upsert succeeds, unchanged rows as they are skipped.
+    
+    Args:
+        account_token (str): The Merge account token
+        model (MergeModel): Registry entry for the model to sync
+        table_name (str, optional): Supabase table name. Defaults to the model's table.
+        page_size (int, optional): Records per Merge page. Defaults to 100.
+        max_pages (int, optional): Stop after this many pages. Defaults to no limit.
+        chunk_size (int, optional): Rows per Supabase upsert. Defaults to SYNC_UPSERT_CHUNK_SIZE.
+        queue_size (int, optional): Max items buffered between stages. Defaults to SYNC_QUEUE_SIZE.
+        write_concurrency (int, optional): Concurrent upserts. Defaults to SYNC_WRITE_CONCURRENCY.
+        full (bool, optional): Ignore the stored watermark and resync everything. Defaults to False.
+        force (bool, optional): Upsert rows even when their content hash is unchanged. Defaults to False.
+        resume (bool, optional): Resume from a saved checkpoint if there is one. Defaults to True.
+        include_deleted (bool, optional): Also fetch records Merge flags as deleted. Defaults to True.
+        on_progress (Callable, optional): Called after each upserted chunk with
+            pages, rows_fetched and rows_written so far
+        
+    Returns:
+        Dict[str, Any]: Result summary, including per-stage throughput
+    """
+    if not get_supabase():
+        return {"success": False, "message": "Supabase client not initialized"}
+    
+    table_name = table_name or model.table_name
+    key = model.conflict_key
+    # Rows travel through the pipeline as compact tuples, indexed by column position
+    key_index = model.spec.index[key]
+    modified_index = model.spec.index.get("modified_at")
+    checkpoint = await asyncio.to_thread(sync_state.get_checkpoint, account_token, table_name) if resume else None
+    if checkpoint and checkpoint["full"] != full:
+        checkpoint = None
+    
+    if checkpoint:
+        watermark = checkpoint["start_watermark"]
+        logger.info("Resuming sync of %s after %d pages (%d rows written)", table_name, checkpoint["pages"], checkpoint["rows_written"])
+    else:
+        watermark = None if full else await asyncio.to_thread(sync_state.get_watermark, account_token, table_name)
+    watermark_at = parse_timestamp(watermark)
+    params: Dict[str, Any] = {"modified_after": watermark} if watermark else {}
+    if include_deleted:
+        params["include_deleted_data"] = "true"
+    if watermark:
+        logger.info("Starting incremental sync of %s modified after %s", table_name, watermark)
+    else:
+        logger.info("Starting full sync of %s", table_name)
+    
+    write_concurrency = max(1, write_concurrency)
+    fetched: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    to_write: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stats = {
+        "fetch": {"rows": 0, "seconds": 0.0},
+        "transform": {"rows": 0, "seconds": 0.0},
+        "write": {"rows": 0, "seconds": 0.0},
+    }
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+    base_pages = checkpoint["pages"] if checkpoint else 0
+    base_rows = checkpoint["rows_written"] if checkpoint else 0
+    pages = 0
+    complete = False
+    
+    # Pages in flight, by sequence number: rows still to write, the cursor that
+    # follows the page and the newest modified_at on it
+    page_state: Dict[int, Dict[str, Any]] = {}
+    committed = {"pages": 0, "latest": checkpoint["latest"] if checkpoint else watermark}
+    checkpoint_lock = asyncio.Lock()
+    
+    def newer(a: Optional[str], b: Optional[str]) -> Optional[str]:
+        a_at, b_at = parse_timestamp(a), parse_timestamp(b)
+        if a_at is None or (b_at is not None and b_at > a_at):
+            return b
+        return a
+    
+    async def save_checkpoint():
+        async with checkpoint_lock:
+            # Advance over the pages whose rows have all been committed, in order
+            advanced = False
+            while committed["pages"] + 1 in page_state and page_state[committed["pages"] + 1]["pending"] == 0:
+                page = page_state.pop(committed["pages"] + 1)
+                committed["pages"] += 1
+                committed["cursor"] = page["cursor"]
+                committed["latest"] = newer(committed["latest"], page["latest"])
+                advanced = True
+            if advanced and committed["cursor"]:
+                await asyncio.to_thread(
+                    sync_state.set_checkpoint, account_token, table_name, committed["cursor"],
+                    base_pages + committed["pages"], base_rows + stats["write"]["rows"],
+                    watermark, committed["latest"], full
+                )
+    
+    async def fetch_stage():
+        nonlocal pages, complete
+        started = time.perf_counter()
+        async for records, next_cursor in iter_merge_pages(
+            account_token, model.path, endpoint=model.endpoint, page_size=page_size, max_pages=max_pages,
+            cursor=checkpoint["cursor"] if checkpoint else None, params=params
+        ):
+            complete = next_cursor is None
+            stats["fetch"]["seconds"] += time.perf_counter() - started
+            stats["fetch"]["rows"] += len(records)
+            SYNC_ROWS_FETCHED.inc(len(records), model=model.name)
+            pages += 1
+            await fetched.put((pages, records, next_cursor))
+            started = time.perf_counter()
+        await fetched.put(None)
+    
+    async def transform_stage():
+        # Buffered as (row, content hash, is new, page number) until a chunk is full
+        buffer: List[Tuple[CompactRow, str, bool, int]] = []
+        while True:
+            item = await fetched.get()
+            if item is None:
+                break
+            seq, records, next_cursor = item
+            started = time.perf_counter()
+            record_count = len(records)
+            rows = []
+            latest = None
+            for row in transform_compact(records, model.spec):
+                row_modified = row[modified_index] if modified_index is not None else None
+                modified_at = parse_timestamp(row_modified)
+                if watermark_at and modified_at and modified_at <= watermark_at:
+                    continue
+                latest = newer(latest, row_modified)
+                rows.append(row)
+            # Drop the raw page before waiting on sync state or the write queue;
+            # only the compact rows are kept from here on
+            del records, item
+            known = await asyncio.to_thread(sync_state.get_row_hashes, table_name, [row[key_index] for row in rows])
+            pending = 0
+            unchanged = []
+            for row in rows:
+                row_hash = compact_content_hash(row, model.spec)
+                previous = known.get(row[key_index])
+                if previous == row_hash and not force:
+                    counts["skipped"] += 1
+                    unchanged.append(row)
+                    continue
+                buffer.append((row, row_hash, previous is None, seq))
+                pending += 1
+            # Unchanged rows are already in Supabase, so they can be indexed now
+            await index_search_rows(account_token, table_name, RowBatch(model.spec, unchanged))
+            page_state[seq] = {"pending": pending, "cursor": next_cursor, "latest": latest}
+            transform_seconds = time.perf_counter() - started
+            stats["transform"]["seconds"] += transform_seconds
+            stats["transform"]["rows"] += record_count
+            SYNC_TRANSFORM_SECONDS.observe(transform_seconds, model=model.name)
+            if not pending:
+                await save_checkpoint()
+            while len(buffer) >= chunk_size:
+                await to_write.put(buffer[:chunk_size])
+                buffer = buffer[chunk_size:]
+        if buffer:
+            await to_write.put(buffer)
+        for _ in range(write_concurrency):
+            await to_write.put(None)
+    
+    async def write_stage():
+        while True:
+            chunk = await to_write.get()
+            if chunk is None:
+                break
+            rows = RowBatch(model.spec, [row for row, _, _, _ in chunk])
+            logger.debug("Upserting %d %s to Supabase", len(rows), model.name)
+            started = time.perf_counter()
+            await upsert_rows(table_name, rows, on_conflict=key)
+            stats["write"]["seconds"] += time.perf_counter() - started
+            stats["write"]["rows"] += len(rows)
+            SYNC_ROWS_WRITTEN.inc(len(rows), model=model.name)
+            # Record hashes and snapshot ids only once the upsert has succeeded
+            await asyncio.to_thread(
+                sync_state.set_row_hashes, table_name, [(row[key_index], row_hash) for row, row_hash, _, _ in chunk]
+            )
+            await asyncio.to_thread(sync_state.add_merge_ids, account_token, table_name, rows.column(key))
+            await index_search_rows(account_token, table_name, rows)
+            inserted = sum(1 for _, _, is_new, _ in chunk if is_new)
+            counts["inserted"] += inserted
+            counts["updated"] += len(chunk) - inserted
+            for _, _, _, seq in chunk:
+                page_state[seq]["pending"] -= 1
+            await save_checkpoint()
+            if on_progress:
+                on_progress({
+                    "pages": base_pages + pages,
+                    "rows_fetched": stats["fetch"]["rows"],
+                    "rows_written": base_rows + stats["write"]["rows"],
+                })
+    
+    started = time.perf_counter()
+    tasks = [
+        asyncio.create_task(fetch_stage()),
+        asyncio.create_task(transform_stage()),
+        *[asyncio.create_task(write_stage()) for _ in range(write_concurrency)],
+    ]
+    
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.error("Error syncing %s to Supabase: %s", model.name, e)
+        return {"success": False, "message": f"Error: {str(e)}", "count": base_rows + stats["write"]["rows"]}
+    
+    elapsed = time.perf_counter() - started
+    total = base_rows + stats["write"]["rows"]
+    latest = committed["latest"]
+    
+    # Rows were written because their records changed in Merge, so cached reads are stale
+    if stats["write"]["rows"]:
+        await response_cache.invalidate_account(account_token)
+    
+    # Only advance the watermark once every page has been written, otherwise
+    # the unfetched pages would be skipped by the next incremental run
+    if complete:
+        if latest and latest != watermark:
+            await asyncio.to_thread(sync_state.set_watermark, account_token, table_name, latest)
+        await asyncio.to_thread(sync_state.clear_checkpoint, account_token, table_name)
+        # Only a full pass in this process has shown the index every row
+        if not watermark and not checkpoint:
+            search_indexes.mark_complete(account_token, table_name)
+    
+    if not stats["fetch"]["rows"] and not watermark and not checkpoint:
+        return {"success": False, "message": f"No {model.name} found or error fetching {model.name}"}
+    
+    return {
+        "success": True,
+        "message": f"Successfully synced {total} {model.name} to Supabase ({counts['skipped']} unchanged)",
+        "count": total,
+        **counts,
+        "pages": base_pages + pages,
+        "mode": "incremental" if watermark else "full",
+        "resumed": bool(checkpoint),
+        "complete": complete,
+        "watermark": latest,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": {
+            "fetched_rows_per_sec": _stage_throughput(stats["fetch"]),
+            "transformed_rows_per_sec": _stage_throughput(stats["transform"]),
+            "written_rows_per_sec": _stage_throughput(stats["write"]),
+            "overall_rows_per_sec": round(stats["write"]["rows"] / elapsed, 1) if elapsed else 0.0,
+        }
+    }
 
-async def sync_candidates_to_supabase(account_token: str, table_name: str = "candidates") -> Dict[str, Any]:
+async def sync_candidates_to_supabase(
+    account_token: str,
+    table_name: str = "candidates",
+    **options: Any,
+) -> Dict[str, Any]:
     """
     Fetch candidates from Merge ATS and sync them to Supabase
     
+    See sync_model_to_supabase for the remaining options.
+    """
+    return await sync_model_to_supabase(account_token, CANDIDATES, table_name=table_name, **options)
+
+async def apply_record_changes(
+    account_token: str,
+    model: MergeModel,
+    records: List[Dict[str, Any]],
+    deleted_ids: Optional[List[str]] = None,
+    table_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Apply a micro-batch of records pushed by Merge (e.g. from webhooks) to Supabase
+    
+    Changed records take the same path as a sync page: they become compact
+    rows, rows whose content hash is unchanged are skipped, and the rest are
+    upserted in one request. Deleted ids are flagged with remote_was_deleted
+    in one update. Sync state and the search index are updated as a sync
+    would update them. Supabase errors are raised, so the caller can retry
+    the batch.
+    
     Args:
         account_token (str): The Merge account token
-        table_name (str, optional): Supabase table name. Defaults to "candidates".
+        model (MergeModel): Registry entry for the records' model
+        records (List[Dict[str, Any]]): Raw Merge records that were added or changed
+        deleted_ids (List[str], optional): Merge ids of records deleted in Merge
+        table_name (str, optional): Supabase table name. Defaults to the model's table.
+        
+    Returns:
+        Dict[str, Any]: Counts of written, unchanged and deleted rows
+    """
+    if not get_supabase():
+        raise RuntimeError("Supabase client not initialized")
+    
+    table_name = table_name or model.table_name
+    key = model.conflict_key
+    key_index = model.spec.index[key]
+    deleted_ids = deleted_ids or []
+    changed: List[Tuple[CompactRow, str]] = []
+    unchanged: List[CompactRow] = []
+    
+    rows = transform_compact(records, model.spec)
+    if rows:
+        known = await asyncio.to_thread(sync_state.get_row_hashes, table_name, [row[key_index] for row in rows])
+        for row in rows:
+            row_hash = compact_content_hash(row, model.spec)
+            if known.get(row[key_index]) == row_hash:
+                unchanged.append(row)
+            else:
+                changed.append((row, row_hash))
+    
+    if changed:
+        batch = RowBatch(model.spec, [row for row, _ in changed])
+        await upsert_rows(table_name, batch, on_conflict=key)
+        SYNC_ROWS_WRITTEN.inc(len(batch), model=model.name)
+        await asyncio.to_thread(
+            sync_state.set_row_hashes, table_name, [(row[key_index], row_hash) for row, row_hash in changed]
+        )
+        await asyncio.to_thread(sync_state.add_merge_ids, account_token, table_name, batch.column(key))
+        await index_search_rows(account_token, table_name, batch)
+    await index_search_rows(account_token, table_name, RowBatch(model.spec, unchanged))
+    
+    if deleted_ids:
+        await soft_delete_rows(table_name, deleted_ids, key)
+        # As in reconciliation: forget the ids, so a record that comes back is written again
+        await asyncio.to_thread(sync_state.remove_merge_ids, account_token, table_name, deleted_ids)
+        await asyncio.to_thread(sync_state.delete_row_hashes, table_name, deleted_ids)
+        await remove_search_rows(account_token, table_name, deleted_ids)
+    
+    if changed or deleted_ids:
+        await response_cache.invalidate_account(account_token)
+    
+    return {"written": len(changed), "unchanged": len(unchanged), "deleted": len(deleted_ids)}
+
+async def reconcile_deleted_records(
+    account_token: str,
+    model: MergeModel = CANDIDATES,
+    table_name: Optional[str] = None,
+    page_size: int = MERGE_MAX_PAGE_SIZE,
+    batch_size: int = RECONCILE_BATCH_SIZE,
+    max_delete_fraction: float = RECONCILE_MAX_DELETE_FRACTION,
+    dry_run: bool = False,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Soft-delete rows whose records have disappeared from Merge
+    
+    Walks the model's ids in Merge (including records flagged as deleted) and
+    tags each one in the account's local merge_id snapshot with this run. Ids
+    left untagged are tombstones: they were synced before but Merge no longer
+    returns them. They are read from the snapshot in merge_id order and
+    flagged with remote_was_deleted in batched updates, so Supabase only sees
+    reads and writes for the rows that actually changed, never a table scan.
+    Records Merge itself flags as deleted, and whose row changed, are upserted
+    through the normal path.
+    
+    Nothing is deleted unless the Merge pass completes, and a run that would
+    tombstone more than max_delete_fraction of the snapshot is refused.
+    
+    Cost: every run walks all of the model's records in Merge, so its Merge
+    calls grow with the total record count (records / page_size requests),
+    not with the number of changes. A hard delete leaves nothing for
+    modified_after to return; only a full id walk can find it. Incremental
+    syncs and webhooks already pick up records Merge flags as deleted, so
+    schedule this rarely (e.g. nightly), not after every sync.
+    
+    Args:
+        account_token (str): The Merge account token
+        model (MergeModel, optional): Registry entry to reconcile. Defaults to candidates.
+        table_name (str, optional): Supabase table name. Defaults to the model's table.
+        page_size (int, optional): Records per Merge page. Defaults to 100.
+        batch_size (int, optional): Rows per soft-delete update. Defaults to RECONCILE_BATCH_SIZE.
+        max_delete_fraction (float, optional): Safety limit on tombstones per run.
+            Defaults to RECONCILE_MAX_DELETE_FRACTION.
+        dry_run (bool, optional): Count tombstones without writing. Defaults to False.
+        on_progress (Callable, optional): Called after each Merge page with
+            pages and rows_fetched, and after each update with rows_written
         
     Returns:
         Dict[str, Any]: Result summary
     """
-    if not supabase:
+    if not get_supabase():
         return {"success": False, "message": "Supabase client not initialized"}
     
+    table_name = table_name or model.table_name
+    key = model.conflict_key
+    run = f"{time.time():.6f}"
+    started = time.perf_counter()
+    seen = 0
+    pages = 0
+    flagged = 0
+    soft_deleted = 0
+    
     try:
-        # Fetch candidates from Merge
-        candidates = await get_candidates(account_token)
-        
-        if not candidates:
-            return {"success": False, "message": "No candidates found or error fetching candidates"}
-        
-        # Transform candidates to make them Supabase-compatible
-        transformed_candidates = []
-        for candidate in candidates:
-            # Format complex fields as JSON strings
-            applications = json.dumps(candidate.get("applications", []))
-            attachments = json.dumps(candidate.get("attachments", []))
-            locations = json.dumps(candidate.get("locations", []))
-            phone_numbers = json.dumps(candidate.get("phone_numbers", []))
-            email_addresses = json.dumps(candidate.get("email_addresses", []))
-            urls = json.dumps(candidate.get("urls", []))
-            tags = json.dumps(candidate.get("tags", []))
-            field_mappings = json.dumps(candidate.get("field_mappings", {}))
-            
-            # Add a merged_id field to use as a primary key
-            transformed_candidate = {
-                "merge_id": candidate.get("id", ""),
-                "remote_id": candidate.get("remote_id", ""),
-                "first_name": candidate.get("first_name", ""),
-                "last_name": candidate.get("last_name", ""),
-                "company": candidate.get("company", ""),
-                "title": candidate.get("title", ""),
-                "email": candidate.get("email_addresses", [{}])[0].get("value", "") if candidate.get("email_addresses") else "",
-                "phone": candidate.get("phone_numbers", [{}])[0].get("value", "") if candidate.get("phone_numbers") else "",
-                "location": candidate.get("locations", [""])[0] if candidate.get("locations") else "",
-                "created_at": candidate.get("created_at", ""),
-                "modified_at": candidate.get("modified_at", ""),
-                "remote_created_at": candidate.get("remote_created_at", ""),
-                "remote_updated_at": candidate.get("remote_updated_at", ""),
-                "applications_json": applications,
-                "attachments_json": attachments,
-                "locations_json": locations,
-                "phone_numbers_json": phone_numbers,
-                "email_addresses_json": email_addresses,
-                "urls_json": urls,
-                "tags_json": tags,
-                "field_mappings_json": field_mappings,
-                "remote_was_deleted": candidate.get("remote_was_deleted", False),
-            }
-            transformed_candidates.append(transformed_candidate)
+        known_before = await asyncio.to_thread(sync_state.count_merge_ids, account_token, table_name)
+        async for records, _ in iter_merge_pages(
+            account_token, model.path, endpoint=model.endpoint, page_size=page_size,
+            params={"include_deleted_data": "true"}
+        ):
+            pages += 1
+            seen += len(records)
+            await asyncio.to_thread(
+                sync_state.mark_merge_ids_seen, account_token, table_name, [record["id"] for record in records], run
+            )
+            deleted = [record for record in records if record.get("remote_was_deleted")]
+            if deleted and not dry_run:
+                rows = transform_records(deleted, model.spec)
+                known = await asyncio.to_thread(sync_state.get_row_hashes, table_name, [row[key] for row in rows])
+                changed = [(row, content_hash(row, model.spec)) for row in rows]
+                changed = [(row, row_hash) for row, row_hash in changed if known.get(row[key]) != row_hash]
+                if changed:
+                    await upsert_rows(table_name, [row for row, _ in changed], on_conflict=key)
+                    await asyncio.to_thread(
+                        sync_state.set_row_hashes, table_name, [(row[key], row_hash) for row, row_hash in changed]
+                    )
+                    flagged += len(changed)
+                await remove_search_rows(account_token, table_name, [row[key] for row in rows])
+            if on_progress:
+                on_progress({"pages": pages, "rows_fetched": seen, "rows_written": flagged})
         
-        # Insert or update candidates in Supabase
-        logger.info(f"Upserting {len(transformed_candidates)} candidates to Supabase")
+        tombstones: List[str] = []
+        after = ""
+        while True:
+            batch = await asyncio.to_thread(
+                sync_state.unseen_merge_ids, account_token, table_name, run, batch_size, after
+            )
+            if not batch:
+                break
+            tombstones.extend(batch)
+            after = batch[-1]
         
-        # Try to create the table first if it doesn't exist
-        try:
-            # This is a simplified approach - in a production app, you'd want to use migrations
-            logger.info(f"Checking if table {table_name} exists...")
-            
-            # Insert data with upsert operation
-            result = supabase.table(table_name).upsert(
-                transformed_candidates, 
-                on_conflict="merge_id"
-            ).execute()
-            
-            logger.info(f"Supabase upsert result: {result}")
-            
-        except Exception as table_error:
-            logger.error(f"Table operation error: {str(table_error)}")
-            return {"success": False, "message": f"Error: {str(table_error)}"}
-        
-        return {
-            "success": True,
-            "message": f"Successfully synced {len(transformed_candidates)} candidates to Supabase",
-            "count": len(transformed_candidates)
-        }
+        if known_before and len(tombstones) > max_delete_fraction * known_before:
+            message = (
+                f"Refusing to soft-delete {len(tombstones)} of {known_before} {model.name}; "
+                f"more than {max_delete_fraction:.0%} vanished from Merge in one run"
+            )
+            logger.error(message)
+            return {"success": False, "message": message, "seen": seen, "tombstones": len(tombstones)}
         
+        if not dry_run:
+            for start in range(0, len(tombstones), batch_size):
+                batch = tombstones[start:start + batch_size]
+                await soft_delete_rows(table_name, batch, key)
+                # Forget the hashes too, so a record that comes back is written again
+                await asyncio.to_thread(sync_state.remove_merge_ids, account_token, table_name, batch)
+                await asyncio.to_thread(sync_state.delete_row_hashes, table_name, batch)
+                await remove_search_rows(account_token, table_name, batch)
+                soft_deleted += len(batch)
+                logger.debug("Soft-deleted %d of %d %s", soft_deleted, len(tombstones), model.name)
+                if on_progress:
+                    on_progress({"pages": pages, "rows_fetched": seen, "rows_written": flagged + soft_deleted})
+    
     except Exception as e:
-        logger.error(f"Error syncing candidates to Supabase: {str(e)}")
-        return {"success": False, "message": f"Error: {str(e)}"}
+        logger.error("Error reconciling %s: %s", model.name, e)
+        return {"success": False, "message": f"Error: {str(e)}", "count": flagged + soft_deleted}
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "success": True,
+        "message": (
+            f"Found {len(tombstones)} deleted {model.name}"
+            + (" (dry run)" if dry_run else f", soft-deleted {soft_deleted}")
+            + f" and updated {flagged} flagged by Merge"
+        ),
+        "count": flagged + soft_deleted,
+        "seen": seen,
+        "pages": pages,
+        "flagged": flagged,
+        "tombstones": len(tombstones),
+        "soft_deleted": soft_deleted,
+        "dry_run": dry_run,
+        "elapsed_seconds": round(elapsed, 3),
+    }
+
+async def sync_models_to_supabase(
+    account_token: str,
+    models: Optional[List[str]] = None,
+    tables: Optional[Dict[str, str]] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """
+    Sync several Merge ATS models to Supabase for one account
+    
+    Every model starts as soon as the models it depends on have finished, so
+    independent models (e.g. candidates and jobs) sync concurrently while
+    parent ids point at rows that were written first. If a model fails, the
+    models that depend on it are skipped.
+    
+    Args:
+        account_token (str): The Merge account token
+        models (List[str], optional): Registry names to sync. Defaults to every model.
+        tables (Dict[str, str], optional): Supabase table name overrides by model name
+        on_progress (Callable, optional): Called with pages, rows_fetched and
+            rows_written summed across models
+        **options: Passed through to sync_model_to_supabase
+        
+    Returns:
+        Dict[str, Any]: Per-model results and totals
+    """
+    ordered = dependency_order(models)
+    tables = tables or {}
+    progress: Dict[str, Dict[str, Any]] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    
+    def model_progress(name: str) -> Callable[[Dict[str, Any]], None]:
+        def update(values: Dict[str, Any]) -> None:
+            progress[name] = values
+            if on_progress:
+                on_progress({
+                    field: sum(model_values.get(field, 0) for model_values in progress.values())
+                    for field in ("pages", "rows_fetched", "rows_written")
+                })
+        return update
+    
+    async def sync_one(model: MergeModel) -> Dict[str, Any]:
+        parents = [tasks[name] for name in model.depends_on if name in tasks]
+        if parents:
+            await asyncio.wait(parents)
+            failed = [name for name in model.depends_on if name in tasks and not tasks[name].result().get("success")]
+            if failed:
+                logger.warning("Skipping %s: %s did not sync", model.name, ", ".join(failed))
+                return {"success": False, "skipped": True, "message": f"Skipped: {', '.join(failed)} did not sync"}
+        try:
+            return await sync_model_to_supabase(
+                account_token, model, table_name=tables.get(model.name),
+                on_progress=model_progress(model.name), **options
+            )
+        except Exception as e:
+            logger.error("Error syncing %s: %s", model.name, e)
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    started = time.perf_counter()
+    # Tasks are created in dependency order, so every parent task exists
+    # before its children look it up
+    for model in ordered:
+        tasks[model.name] = asyncio.create_task(sync_one(model))
+    try:
+        await asyncio.gather(*tasks.values())
+    except asyncio.CancelledError:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    elapsed = time.perf_counter() - started
+    
+    results = {name: task.result() for name, task in tasks.items()}
+    succeeded = [name for name, result in results.items() if result.get("success")]
+    total = sum(result.get("count", 0) or 0 for result in results.values())
+    return {
+        "success": len(succeeded) == len(results),
+        "message": f"Synced {len(succeeded)} of {len(results)} models ({total} rows)",
+        "count": total,
+        "models": results,
+        "elapsed_seconds": round(elapsed, 3),
+    }
 
 # Example usage
 # if __name__ == "__main__":
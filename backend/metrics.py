@@ -0,0 +1,257 @@
+import os
+import math
+import time
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Add a Server-Timing header with the app's handling time to every response
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "false").lower() in ("1", "true", "yes")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    A named metric with a fixed set of label names, in the Prometheus text format
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _label_text(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.label_names, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [bucket counts..., sum]; counts are not cumulative until rendered
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels: Any) -> "_Timer":
+        """
+        Context manager that observes the elapsed time of its block
+        """
+        return _Timer(self, labels)
+
+    def count(self, **labels: Any) -> int:
+        series = self._values.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(series)) for key, series in self._values.items()]
+        lines = []
+        for key, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, ('le', _format_value(bound)))} {int(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {int(cumulative)}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class MetricsRegistry:
+    """
+    Holds every metric and renders them for a /metrics scrape
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Shared registry scraped by GET /metrics in app.py
+registry = MetricsRegistry()
+
+MERGE_REQUEST_SECONDS: Histogram = registry.register(Histogram(
+    "merge_request_duration_seconds", "Merge API request latency per attempt", ["endpoint", "status"]
+))
+MERGE_RETRIES: Counter = registry.register(Counter(
+    "merge_retries_total", "Merge API requests retried after a throttle, 5xx or transport error", ["reason"]
+))
+SYNC_TRANSFORM_SECONDS: Histogram = registry.register(Histogram(
+    "sync_transform_duration_seconds", "Time to transform and hash one Merge page", ["model"]
+))
+SUPABASE_UPSERT_SECONDS: Histogram = registry.register(Histogram(
+    "supabase_upsert_duration_seconds", "Supabase upsert latency per batch", ["table"]
+))
+SUPABASE_UPSERT_BATCH_ROWS: Histogram = registry.register(Histogram(
+    "supabase_upsert_batch_rows", "Rows per Supabase upsert batch", ["table"], buckets=BATCH_SIZE_BUCKETS
+))
+SYNC_ROWS_FETCHED: Counter = registry.register(Counter(
+    "sync_rows_fetched_total", "Records fetched from Merge by syncs", ["model"]
+))
+SYNC_ROWS_WRITTEN: Counter = registry.register(Counter(
+    "sync_rows_written_total", "Rows upserted to Supabase by syncs", ["model"]
+))
+SYNC_JOBS_ACTIVE: Gauge = registry.register(Gauge(
+    "sync_jobs_active", "Sync jobs currently running"
+))
+SYNC_JOBS_ACTIVE.set(0)
+SEARCH_INDEX_DOCUMENTS: Gauge = registry.register(Gauge(
+    "search_index_documents", "Candidates held in the local search indexes"
+))
+SEARCH_INDEX_BYTES: Gauge = registry.register(Gauge(
+    "search_index_bytes", "Estimated memory held by the local search indexes"
+))
+WEBHOOK_EVENTS: Counter = registry.register(Counter(
+    "webhook_events_total", "Merge webhook deliveries by outcome", ["model", "result"]
+))
+WEBHOOK_QUEUE_DEPTH: Gauge = registry.register(Gauge(
+    "webhook_queue_depth", "Coalesced webhook changes waiting to be applied"
+))
+WEBHOOK_APPLY_LAG_SECONDS: Histogram = registry.register(Histogram(
+    "webhook_apply_lag_seconds", "Time from a change's first webhook to its write to Supabase", ["model"]
+))
+HTTP_REQUEST_SECONDS: Histogram = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to handle an API request, until the response starts",
+    ["method", "route", "status"]
+))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times each request, optionally adding a Server-Timing header
+
+    Requests are labelled with the matched route template (e.g.
+    /merge-supabase/jobs/{job_id}), so ids do not create new series.
+    """
+
+    def __init__(self, app: Any, timing_header: bool = METRICS_TIMING_HEADER):
+        self.app = app
+        self.timing_header = timing_header
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                route = scope.get("route")
+                HTTP_REQUEST_SECONDS.observe(
+                    elapsed,
+                    method=scope["method"],
+                    route=getattr(route, "path", "unmatched"),
+                    status=message["status"],
+                )
+                if self.timing_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", f"app;dur={elapsed * 1000:.1f}".encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
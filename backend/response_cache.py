@@ -0,0 +1,179 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from candidate_transform import encode_json
+from sync_state import account_key
+
+logger = logging.getLogger(__name__)
+
+# Response cache configuration
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+
+# A cached response: (etag, encoded JSON body)
+CachedBody = Tuple[str, bytes]
+
+
+class MemoryCacheBackend:
+    """
+    In-process cache with per-entry TTL and LRU eviction by entry count and size
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, CachedBody]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: CachedBody, ttl: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.size += len(value[1])
+        while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        _, (_, body) = self._entries.pop(key)
+        self.size -= len(body)
+
+
+class RedisCacheBackend:
+    """
+    Shared cache for multi-worker deployments; needs the optional redis package
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[CachedBody]:
+        raw = await self.redis.get(f"response-cache:{key}")
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        return etag.decode("utf-8"), body
+
+    async def set(self, key: str, value: CachedBody, ttl: float) -> None:
+        etag, body = value
+        await self.redis.set(f"response-cache:{key}", etag.encode("utf-8") + b"\n" + body, px=int(ttl * 1000))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        async for key in self.redis.scan_iter(match=f"response-cache:{prefix}*"):
+            await self.redis.delete(key)
+
+
+def cache_key(account_token: str, endpoint: str, **params: Any) -> str:
+    """
+    Cache key from the account token hash, endpoint and request parameters
+    """
+    query = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    return f"{account_key(account_token)}:{endpoint}:{query}"
+
+
+class ResponseCache:
+    """
+    Async read-through cache for JSON responses
+
+    Concurrent misses for the same key share one load (single-flight), and
+    every entry carries an ETag so clients can revalidate with If-None-Match.
+    """
+
+    def __init__(self, backend: Any = None, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[CachedBody]:
+        """
+        Return the cached body for key, calling loader on a miss
+
+        The loader returns the response body, or None for a result that
+        should not be cached (e.g. nothing found). It runs in its own task,
+        so a caller that is cancelled (e.g. its client disconnected) does
+        not fail the other callers waiting on the same load.
+        """
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            pending = self._loading[key] = asyncio.ensure_future(self._load(key, loader))
+            # Retrieve the exception even when every caller has gone away
+            pending.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(pending)
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[CachedBody]:
+        try:
+            body = await loader()
+            if body is None:
+                return None
+            encoded = encode_json(body).encode("utf-8")
+            value = (f'"{hashlib.sha1(encoded).hexdigest()}"', encoded)
+            await self.backend.set(key, value, self.ttl)
+            return value
+        finally:
+            del self._loading[key]
+
+    async def invalidate_account(self, account_token: str) -> None:
+        """
+        Drop every cached response for an account, e.g. once its data has changed in Merge
+        """
+        await self.backend.delete_prefix(f"{account_key(account_token)}:")
+
+    def metrics(self) -> Dict[str, Any]:
+        metrics = {"hits": self.hits, "misses": self.misses, "loading": len(self._loading)}
+        if isinstance(self.backend, MemoryCacheBackend):
+            metrics.update(entries=len(self.backend._entries), bytes=self.backend.size)
+        return metrics
+
+
+def _make_backend() -> Any:
+    if RESPONSE_CACHE_REDIS_URL:
+        try:
+            return RedisCacheBackend(RESPONSE_CACHE_REDIS_URL)
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_REDIS_URL is set but redis is not installed, using the in-process cache")
+    return MemoryCacheBackend()
+
+
+# Shared instance used by the read routes
+response_cache = ResponseCache(_make_backend())
@@ -0,0 +1,447 @@
+import os
+import re
+import json
+import time
+import heapq
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from candidate_transform import RecordSpec, RowBatch
+from sync_state import account_key, parse_timestamp
+from metrics import SEARCH_INDEX_DOCUMENTS, SEARCH_INDEX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Search index configuration; off by default, since it keeps every synced
+# candidate in memory (about 160 MB per 100k candidates)
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+# Estimated memory across all indexes; least recently used account indexes are dropped past it
+SEARCH_INDEX_MAX_BYTES = int(os.getenv("SEARCH_INDEX_MAX_BYTES", str(256 * 1024 * 1024)))
+# Shorter query words only match whole words; a one-letter prefix would match most of the index
+SEARCH_MIN_PREFIX = int(os.getenv("SEARCH_MIN_PREFIX", "2"))
+
+# Columns a table needs for its rows to be indexed
+SEARCH_COLUMNS = ["merge_id", "first_name", "last_name", "email", "company", "title", "tags_json", "remote_updated_at"]
+# Below this many matches, further query words are checked against each
+# document instead of expanding the word's prefix over the whole index
+FILTER_THRESHOLD = 1000
+
+# Tokens per sorted block; see SortedTokens
+TOKEN_BLOCK_SIZE = 1000
+
+# Rough per-item costs for the memory estimate: a shared posting is a set
+# entry (plus the set's spare capacity), a token a dict entry, a sorted list
+# slot and the str
+POSTING_BYTES = 40
+TOKEN_BYTES = 120
+DOCUMENT_BYTES = 200
+STRING_BYTES = 50
+
+_WORD = re.compile(r"\w+")
+
+# An indexed candidate: (merge_id, first_name, last_name, email, company, title, tags, remote_updated_at)
+Document = Tuple[str, str, str, str, str, str, Tuple[str, ...], str]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase words; "jane.doe@example.com" gives jane, doe, example, com
+    """
+    return _WORD.findall(text.lower()) if text else []
+
+
+def _tags(value: Any) -> Tuple[str, ...]:
+    try:
+        tags = json.loads(value) if value else []
+    except ValueError:
+        return ()
+    names = []
+    for tag in tags if isinstance(tags, list) else []:
+        name = tag.get("name") if isinstance(tag, dict) else tag
+        if isinstance(name, str) and name:
+            names.append(name)
+    return tuple(names)
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else ""
+
+
+# Sort key for documents without a remote_updated_at; they are listed last
+UNDATED = float("-inf")
+
+
+def _timestamp(value: Optional[str]) -> float:
+    parsed = parse_timestamp(value)
+    return parsed.timestamp() if parsed else UNDATED
+
+
+class SortedTokens:
+    """
+    Sorted set of tokens stored as a list of blocks, for prefix scans
+
+    A single sorted list would move every later token on each insert; here
+    an insert or removal only shifts one block, and a block is split once it
+    reaches twice TOKEN_BLOCK_SIZE.
+    """
+
+    def __init__(self, block_size: int = TOKEN_BLOCK_SIZE):
+        self.block_size = block_size
+        self._blocks: List[List[str]] = []
+        # Last token of each block, to find the block for a token by bisection
+        self._maxes: List[str] = []
+
+    def add(self, token: str) -> None:
+        if not self._blocks:
+            self._blocks.append([token])
+            self._maxes.append(token)
+            return
+        i = min(bisect.bisect_left(self._maxes, token), len(self._blocks) - 1)
+        block = self._blocks[i]
+        bisect.insort(block, token)
+        self._maxes[i] = block[-1]
+        if len(block) >= 2 * self.block_size:
+            self._blocks[i:i + 1] = [block[:self.block_size], block[self.block_size:]]
+            self._maxes[i:i + 1] = [block[self.block_size - 1], block[-1]]
+
+    def remove(self, token: str) -> None:
+        i = bisect.bisect_left(self._maxes, token)
+        if i == len(self._blocks):
+            return
+        block = self._blocks[i]
+        j = bisect.bisect_left(block, token)
+        if j < len(block) and block[j] == token:
+            del block[j]
+            if block:
+                self._maxes[i] = block[-1]
+            else:
+                del self._blocks[i]
+                del self._maxes[i]
+
+    def with_prefix(self, prefix: str) -> Iterator[str]:
+        i = bisect.bisect_left(self._maxes, prefix)
+        while i < len(self._blocks):
+            block = self._blocks[i]
+            for j in range(bisect.bisect_left(block, prefix), len(block)):
+                if not block[j].startswith(prefix):
+                    return
+                yield block[j]
+            i += 1
+
+
+class SearchIndex:
+    """
+    Inverted index over one account's synced candidates
+
+    Words from the name, email, company and title columns and from the tags
+    map to the ids of the documents containing them, and the tokens are also
+    kept sorted so a prefix query is a bisection and a short scan. Every
+    method runs on the event loop; none of them block.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._docs: Dict[int, Document] = {}
+        self._updated: Dict[int, float] = {}
+        # A token found in one document maps to its id, a token in several to
+        # a set of ids; most tokens (emails, surnames) are unique, and a set
+        # costs far more than an int
+        self._postings: Dict[str, Union[int, Set[int]]] = {}
+        self._tokens_sorted = SortedTokens()
+        self._next_id = 0
+        self.shared_postings = 0
+        self.text_bytes = 0
+        self.complete = False
+        self.truncated = False
+
+    @property
+    def size(self) -> int:
+        """
+        Estimated memory held by the index, in bytes
+        """
+        return (
+            len(self._docs) * DOCUMENT_BYTES + self.text_bytes
+            + self.shared_postings * POSTING_BYTES + len(self._postings) * TOKEN_BYTES
+        )
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _text(doc: Document) -> str:
+        # Every indexed value in one string, so a document is tokenized with one regex pass
+        return " ".join([*doc[1:6], *doc[6]])
+
+    @staticmethod
+    def _doc_bytes(doc: Document, text: str) -> int:
+        return len(doc[0]) + len(text) + STRING_BYTES * (6 + len(doc[6]))
+
+    def add(self, doc: Document, max_bytes: Optional[int] = None) -> bool:
+        """
+        Add or replace a document
+
+        Returns False, and marks the index truncated, when a new document
+        would take the index past max_bytes; replacements are always applied.
+        """
+        merge_id = doc[0]
+        doc_id = self._ids.get(merge_id)
+        if doc_id is None:
+            if max_bytes is not None and self.size > max_bytes:
+                self.truncated = True
+                return False
+            doc_id = self._ids[merge_id] = self._next_id
+            self._next_id += 1
+        else:
+            self._unindex(doc_id)
+
+        text = self._text(doc)
+        tokens = set(tokenize(text))
+        self._docs[doc_id] = doc
+        self._updated[doc_id] = _timestamp(doc[7])
+        self.text_bytes += self._doc_bytes(doc, text)
+        postings = self._postings
+        for token in tokens:
+            posting = postings.get(token)
+            if posting is None:
+                postings[token] = doc_id
+                self._tokens_sorted.add(token)
+            elif type(posting) is int:
+                postings[token] = {posting, doc_id}
+                self.shared_postings += 2
+            else:
+                posting.add(doc_id)
+                self.shared_postings += 1
+        return True
+
+    def remove(self, merge_id: str) -> None:
+        doc_id = self._ids.pop(merge_id, None)
+        if doc_id is not None:
+            self._unindex(doc_id)
+            del self._docs[doc_id]
+            del self._updated[doc_id]
+
+    def _unindex(self, doc_id: int) -> None:
+        doc = self._docs[doc_id]
+        text = self._text(doc)
+        tokens = set(tokenize(text))
+        self.text_bytes -= self._doc_bytes(doc, text)
+        postings = self._postings
+        for token in tokens:
+            posting = postings[token]
+            if type(posting) is int:
+                del postings[token]
+                self._tokens_sorted.remove(token)
+            else:
+                posting.discard(doc_id)
+                self.shared_postings -= 1
+                if len(posting) == 1:
+                    postings[token] = posting.pop()
+                    self.shared_postings -= 1
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        postings = self._postings
+        tokens = self._tokens_sorted.with_prefix(prefix) if len(prefix) >= SEARCH_MIN_PREFIX else [prefix]
+        matches: Set[int] = set()
+        single = []
+        for token in tokens:
+            posting = postings.get(token)
+            if type(posting) is int:
+                single.append(posting)
+            elif posting:
+                matches |= posting
+        matches.update(single)
+        return matches
+
+    def _doc_matches(self, doc_id: int, term: str) -> bool:
+        tokens = tokenize(self._text(self._docs[doc_id]))
+        if len(term) < SEARCH_MIN_PREFIX:
+            return term in tokens
+        return any(token.startswith(term) for token in tokens)
+
+    def search(
+        self,
+        query: str = "",
+        updated_after: Optional[str] = None,
+        updated_before: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[int, List[Document]]:
+        """
+        Find documents matching every word of the query as a prefix
+
+        Args:
+            query (str, optional): Words to match as prefixes (words shorter than
+                SEARCH_MIN_PREFIX must match whole words); "jan acme" finds Jane
+                at Acme. Defaults to all documents.
+            updated_after (str, optional): Only documents with a later remote_updated_at
+            updated_before (str, optional): Only documents with an earlier remote_updated_at
+            limit (int, optional): Documents to return. Defaults to 20.
+            offset (int, optional): Documents to skip. Defaults to 0.
+
+        Returns:
+            Tuple[int, List[Document]]: Total matches and the requested page,
+            newest remote_updated_at first
+        """
+        ids: Optional[Set[int]] = None
+        # Longest words first: they match the fewest documents, so later
+        # words usually only have to narrow a small set
+        for term in sorted(set(tokenize(query)), key=len, reverse=True):
+            if ids is not None and len(ids) <= FILTER_THRESHOLD:
+                ids = {doc_id for doc_id in ids if self._doc_matches(doc_id, term)}
+            else:
+                matches = self._prefix_matches(term)
+                ids = matches if ids is None else ids & matches
+            if not ids:
+                return 0, []
+
+        updated = self._updated
+        candidates: Iterable[int] = self._docs if ids is None else ids
+        if updated_after or updated_before:
+            after = _timestamp(updated_after) if updated_after else UNDATED
+            before = _timestamp(updated_before) if updated_before else float("inf")
+            candidates = [doc_id for doc_id in candidates if after < updated[doc_id] < before]
+
+        count = len(candidates)
+        # Only the requested page needs ordering; nlargest avoids sorting every match
+        page = heapq.nlargest(offset + limit, candidates, key=updated.__getitem__)[offset:]
+        return count, [self._docs[doc_id] for doc_id in page]
+
+
+class SearchIndexes:
+    """
+    Search indexes by account and table, capped by estimated memory
+
+    Indexes are filled from sync batches, so an index only covers an account
+    once a full sync has run in this process; until then it is incomplete.
+    Past max_bytes, the least recently used indexes are dropped; an index
+    that alone exceeds the cap stops taking new documents and is marked
+    truncated.
+
+    Syncs update the indexes from worker threads while searches read them,
+    so every access takes the same lock.
+    """
+
+    def __init__(self, max_bytes: int = SEARCH_INDEX_MAX_BYTES, enabled: bool = SEARCH_INDEX_ENABLED):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._indexes: "OrderedDict[Tuple[str, str], SearchIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(spec: RecordSpec) -> bool:
+        return all(column in spec.index for column in SEARCH_COLUMNS)
+
+    def get(self, account_token: str, table_name: str) -> Optional[SearchIndex]:
+        key = (account_key(account_token), table_name)
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+        return index
+
+    def index_rows(self, account_token: str, table_name: str, batch: RowBatch) -> None:
+        """
+        Apply a batch of synced rows: add or replace live rows, drop deleted ones
+        """
+        if not self.enabled or not batch or not self.supports(batch.spec):
+            return
+        with self._lock:
+            self._index_rows(account_token, table_name, batch)
+
+    def _index_rows(self, account_token: str, table_name: str, batch: RowBatch) -> None:
+        key = (account_key(account_token), table_name)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = SearchIndex()
+        self._indexes.move_to_end(key)
+
+        position = batch.spec.index
+        columns = [position[column] for column in SEARCH_COLUMNS]
+        deleted = position.get("remote_was_deleted")
+        for row in batch:
+            merge_id, first_name, last_name, email, company, title, tags, updated_at = (row[i] for i in columns)
+            if deleted is not None and row[deleted]:
+                index.remove(merge_id)
+                continue
+            index.add((
+                merge_id, _text(first_name), _text(last_name), _text(email), _text(company), _text(title),
+                _tags(tags), _text(updated_at),
+            ), self.max_bytes)
+        # Make room by dropping other indexes, least recently used first
+        self._evict(keep=key)
+
+    def remove(self, account_token: str, table_name: str, merge_ids: List[str]) -> None:
+        with self._lock:
+            index = self._indexes.get((account_key(account_token), table_name))
+            if index is not None:
+                for merge_id in merge_ids:
+                    index.remove(merge_id)
+                self._update_metrics()
+
+    def mark_complete(self, account_token: str, table_name: str) -> None:
+        """
+        Record that a full sync has passed every row of the account through the index
+        """
+        with self._lock:
+            index = self._indexes.get((account_key(account_token), table_name))
+            if index is not None and not index.truncated:
+                index.complete = True
+
+    @property
+    def size(self) -> int:
+        return sum(index.size for index in self._indexes.values())
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        size = self.size
+        for key in list(self._indexes):
+            if size <= self.max_bytes:
+                break
+            if key != keep:
+                size -= self._indexes.pop(key).size
+                logger.info("Dropped the search index for %s to stay under SEARCH_INDEX_MAX_BYTES", key[1])
+        self._update_metrics()
+
+    def _update_metrics(self) -> None:
+        SEARCH_INDEX_DOCUMENTS.set(sum(len(index) for index in self._indexes.values()))
+        SEARCH_INDEX_BYTES.set(self.size)
+
+    def search(self, account_token: str, table_name: str, query: str = "", **options: Any) -> Dict[str, Any]:
+        """
+        Search one account's index
+
+        Returns:
+            Dict[str, Any]: count, data (candidate dicts), complete, and the time taken
+        """
+        started = time.perf_counter()
+        with self._lock:
+            index = self.get(account_token, table_name)
+            if index is None:
+                return {"count": 0, "data": [], "complete": False, "indexed": 0, "elapsed_ms": 0.0}
+            count, docs = index.search(query, **options)
+            complete = index.complete and not index.truncated
+            indexed = len(index)
+        return {
+            "count": count,
+            "data": [
+                {
+                    "merge_id": merge_id,
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "email": email,
+                    "company": company,
+                    "title": title,
+                    "tags": list(tags),
+                    "remote_updated_at": updated_at,
+                }
+                for merge_id, first_name, last_name, email, company, title, tags, updated_at in docs
+            ],
+            "complete": complete,
+            "indexed": indexed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+# Shared indexes, filled by sync_model_to_supabase and read by the search endpoint
+search_indexes = SearchIndexes()
@@ -0,0 +1,256 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sync_state import account_key
+from metrics import SYNC_JOBS_ACTIVE
+
+logger = logging.getLogger(__name__)
+
+# Background sync configuration
+SYNC_JOB_WORKERS = int(os.getenv("SYNC_JOB_WORKERS", "8"))
+SYNC_JOB_HISTORY = int(os.getenv("SYNC_JOB_HISTORY", "1000"))
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+SyncRunner = Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+# Seconds a cancel request waits for the job to stop before answering "cancelling"
+SYNC_JOB_CANCEL_WAIT = float(os.getenv("SYNC_JOB_CANCEL_WAIT", "5"))
+
+
+class SyncJob:
+    """
+    A background sync and its progress
+
+    A job without an account token is a parent that runs other jobs (e.g. a
+    bulk sync); its children's progress is added to its own.
+    """
+
+    def __init__(
+        self,
+        account_token: Optional[str],
+        table_name: str,
+        expected_rows: Optional[int] = None,
+        parent: Optional["SyncJob"] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.account_key = account_key(account_token) if account_token else None
+        self.table_name = table_name
+        self.parent = parent
+        self.children: List["SyncJob"] = []
+        self.status = "queued"
+        self.pages = 0
+        self.rows_fetched = 0
+        self.rows_written = 0
+        self.expected_rows = expected_rows
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def update(self, progress: Dict[str, Any]) -> None:
+        before = (self.pages, self.rows_fetched, self.rows_written)
+        self.pages = progress.get("pages", self.pages)
+        self.rows_fetched = progress.get("rows_fetched", self.rows_fetched)
+        self.rows_written = progress.get("rows_written", self.rows_written)
+        if self.parent is not None:
+            self.parent.update({
+                "pages": self.parent.pages + self.pages - before[0],
+                "rows_fetched": self.parent.rows_fetched + self.rows_fetched - before[1],
+                "rows_written": self.parent.rows_written + self.rows_written - before[2],
+            })
+
+    @property
+    def rate(self) -> float:
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return round(self.rows_written / elapsed, 1) if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        # Merge does not report totals, so the ETA is based on the last run's row count
+        if self.status != "running" or not self.expected_rows or not self.rate:
+            return None
+        return round(max(self.expected_rows - self.rows_written, 0) / self.rate, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "table_name": self.table_name,
+            "parent_job_id": self.parent.id if self.parent else None,
+            "pages": self.pages,
+            "rows_fetched": self.rows_fetched,
+            "rows_written": self.rows_written,
+            "rows_per_sec": self.rate,
+            "expected_rows": self.expected_rows,
+            "eta_seconds": self.eta_seconds,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+        if self.children:
+            data["children"] = [
+                {
+                    "job_id": child.id,
+                    "status": child.status,
+                    "rows_written": child.rows_written,
+                    "error": child.error,
+                }
+                for child in self.children
+            ]
+        return data
+
+
+class SyncJobManager:
+    """
+    Runs syncs as background asyncio tasks on a bounded worker pool
+
+    At most one job is active per account token, and at most `workers` jobs
+    run at once; the rest wait in the queued state. Parent jobs (submitted
+    without an account token) only wait on their children, so they do not
+    take a worker slot.
+    """
+
+    def __init__(self, workers: int = SYNC_JOB_WORKERS, history: int = SYNC_JOB_HISTORY):
+        self.workers = workers
+        self.history = history
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._jobs: "OrderedDict[str, SyncJob]" = OrderedDict()
+        self._active: Dict[str, str] = {}
+        self._last_rows: Dict[tuple, int] = {}
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._slots
+
+    def get(self, job_id: str) -> Optional[SyncJob]:
+        return self._jobs.get(job_id)
+
+    def active_job(self, account_token: str) -> Optional[SyncJob]:
+        job_id = self._active.get(account_key(account_token))
+        return self._jobs.get(job_id) if job_id else None
+
+    def submit(
+        self,
+        account_token: Optional[str],
+        table_name: str,
+        run: SyncRunner,
+        parent: Optional[SyncJob] = None,
+    ) -> SyncJob:
+        """
+        Start a background sync
+
+        Args:
+            account_token (str): The Merge account token, or None for a parent job
+            table_name (str): Supabase table name
+            run (SyncRunner): Coroutine function that performs the sync; it is
+                passed a progress callback
+            parent (SyncJob, optional): Job this sync runs as part of
+
+        Returns:
+            SyncJob: The new job
+
+        Raises:
+            ValueError: If a sync is already active for this account token
+        """
+        existing = self.active_job(account_token) if account_token else None
+        if existing:
+            raise ValueError(f"Sync {existing.id} is already {existing.status} for this account")
+
+        expected_rows = self._last_rows.get((account_key(account_token), table_name)) if account_token else None
+        job = SyncJob(account_token, table_name, expected_rows, parent=parent)
+        self._jobs[job.id] = job
+        if job.account_key:
+            self._active[job.account_key] = job.id
+        if parent is not None:
+            parent.children.append(job)
+        job.task = asyncio.create_task(self._run(job, run))
+        self._prune()
+        logger.info("Queued sync job %s for %s", job.id, table_name)
+        return job
+
+    async def _run(self, job: SyncJob, run: SyncRunner) -> None:
+        try:
+            if job.account_key:
+                async with self.slots:
+                    job.status = "running"
+                    job.started_at = time.time()
+                    SYNC_JOBS_ACTIVE.inc()
+                    try:
+                        result = await run(job.update)
+                    finally:
+                        SYNC_JOBS_ACTIVE.dec()
+            else:
+                job.status = "running"
+                job.started_at = time.time()
+                result = await run(job.update)
+            job.result = result
+            job.update({"rows_written": result.get("count", job.rows_written)})
+            job.status = "succeeded" if result.get("success") else "failed"
+            if not result.get("success"):
+                job.error = result.get("message")
+            elif job.account_key:
+                self._last_rows[(job.account_key, job.table_name)] = job.rows_written
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            logger.info("Sync job %s cancelled", job.id)
+            # A parent only waits on its children, so they are cancelled with it
+            for child in job.children:
+                if child.status in ACTIVE_STATUSES and child.task:
+                    child.task.cancel()
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error("Sync job %s failed: %s", job.id, e)
+        finally:
+            job.finished_at = time.time()
+            if job.account_key and self._active.get(job.account_key) == job.id:
+                del self._active[job.account_key]
+
+    async def cancel(self, job_id: str, wait: float = SYNC_JOB_CANCEL_WAIT) -> Optional[SyncJob]:
+        """
+        Cancel a queued or running job and wait briefly for it to stop
+
+        Returns:
+            SyncJob: The job, "cancelled" once it has stopped, or still
+            "cancelling" if it did not stop within `wait` seconds
+        """
+        job = self._jobs.get(job_id)
+        if job and job.status in ACTIVE_STATUSES and job.task:
+            job.status = "cancelling"
+            job.task.cancel()
+            await asyncio.wait([job.task], timeout=wait)
+        return job
+
+    async def shutdown(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs once the history is full
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history:
+                break
+            if self._jobs[job_id].status not in ACTIVE_STATUSES:
+                del self._jobs[job_id]
+
+
+# Shared instance used by the routes and shut down by the lifespan hook in app.py
+sync_jobs = SyncJobManager()
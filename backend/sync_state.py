@@ -0,0 +1,312 @@
+import os
+import logging
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on bound parameters is 999
+SQLITE_MAX_PARAMS = 900
+
+# Local durable store for sync bookkeeping (watermarks, row hashes, checkpoints
+# and the merge_id snapshots used to find hard-deleted records)
+SYNC_STATE_PATH = os.getenv(
+    "SYNC_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sync_state.db")
+)
+
+
+def account_key(account_token: str) -> str:
+    """
+    Stable, non-reversible key for an account token so raw tokens are never stored
+    """
+    return hashlib.sha256(account_token.encode("utf-8")).hexdigest()[:32]
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a Merge ISO-8601 timestamp, returning None for empty or invalid values
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class SyncStateStore:
+    """
+    SQLite-backed store for per-account, per-table sync state
+    """
+
+    def __init__(self, path: str = SYNC_STATE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_watermarks (
+                    account_key TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    watermark TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (account_key, table_name)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS row_hashes (
+                    table_name TEXT NOT NULL,
+                    merge_id TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    PRIMARY KEY (table_name, merge_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_checkpoints (
+                    account_key TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    cursor TEXT,
+                    pages INTEGER NOT NULL,
+                    rows_written INTEGER NOT NULL,
+                    start_watermark TEXT,
+                    latest TEXT,
+                    full INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (account_key, table_name)
+                )
+                """
+            )
+            # Sorted set of the merge_ids each account has synced, tagged with the
+            # reconciliation run that last saw them in Merge
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS merge_ids (
+                    account_key TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    merge_id TEXT NOT NULL,
+                    run TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (account_key, table_name, merge_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_watermark(self, account_token: str, table_name: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT watermark FROM sync_watermarks WHERE account_key = ? AND table_name = ?",
+                (account_key(account_token), table_name),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, account_token: str, table_name: str, watermark: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT INTO sync_watermarks (account_key, table_name, watermark, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (account_key, table_name)
+                DO UPDATE SET watermark = excluded.watermark, updated_at = excluded.updated_at
+                """,
+                (account_key(account_token), table_name, watermark, datetime.now(timezone.utc).isoformat()),
+            )
+            self.conn.commit()
+        logger.info("Saved %s watermark %s", table_name, watermark)
+
+    def clear_watermark(self, account_token: str, table_name: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM sync_watermarks WHERE account_key = ? AND table_name = ?",
+                (account_key(account_token), table_name),
+            )
+            self.conn.commit()
+
+    def get_row_hashes(self, table_name: str, merge_ids: List[str]) -> Dict[str, str]:
+        """
+        Look up the content hashes last written for the given rows
+        """
+        hashes: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(merge_ids), SQLITE_MAX_PARAMS):
+                batch = merge_ids[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                hashes.update(self.conn.execute(
+                    f"SELECT merge_id, hash FROM row_hashes WHERE table_name = ? AND merge_id IN ({placeholders})",
+                    (table_name, *batch),
+                ).fetchall())
+        return hashes
+
+    def set_row_hashes(self, table_name: str, hashes: Iterable[Tuple[str, str]]) -> None:
+        """
+        Record the content hashes of rows that were just written
+        """
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO row_hashes (table_name, merge_id, hash) VALUES (?, ?, ?)",
+                ((table_name, merge_id, row_hash) for merge_id, row_hash in hashes),
+            )
+            self.conn.commit()
+
+    def clear_row_hashes(self, table_name: str) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM row_hashes WHERE table_name = ?", (table_name,))
+            self.conn.commit()
+
+    def delete_row_hashes(self, table_name: str, merge_ids: List[str]) -> None:
+        with self._lock:
+            for start in range(0, len(merge_ids), SQLITE_MAX_PARAMS):
+                batch = merge_ids[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                self.conn.execute(
+                    f"DELETE FROM row_hashes WHERE table_name = ? AND merge_id IN ({placeholders})",
+                    (table_name, *batch),
+                )
+            self.conn.commit()
+
+    def add_merge_ids(self, account_token: str, table_name: str, merge_ids: Iterable[str]) -> None:
+        """
+        Add written rows to the account's merge_id snapshot, keeping the run of ids already in it
+        """
+        key = account_key(account_token)
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO merge_ids (account_key, table_name, merge_id) VALUES (?, ?, ?)",
+                ((key, table_name, merge_id) for merge_id in merge_ids),
+            )
+            self.conn.commit()
+
+    def mark_merge_ids_seen(self, account_token: str, table_name: str, merge_ids: Iterable[str], run: str) -> None:
+        """
+        Tag ids that a reconciliation run found in Merge, adding any the snapshot was missing
+        """
+        key = account_key(account_token)
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO merge_ids (account_key, table_name, merge_id, run) VALUES (?, ?, ?, ?)",
+                ((key, table_name, merge_id, run) for merge_id in merge_ids),
+            )
+            self.conn.commit()
+
+    def count_merge_ids(self, account_token: str, table_name: str) -> int:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM merge_ids WHERE account_key = ? AND table_name = ?",
+                (account_key(account_token), table_name),
+            ).fetchone()
+        return row[0]
+
+    def unseen_merge_ids(
+        self,
+        account_token: str,
+        table_name: str,
+        run: str,
+        limit: int,
+        after: str = "",
+    ) -> List[str]:
+        """
+        Next batch of snapshot ids, in merge_id order, that the given run did not see
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                SELECT merge_id FROM merge_ids
+                WHERE account_key = ? AND table_name = ? AND merge_id > ? AND run != ?
+                ORDER BY merge_id LIMIT ?
+                """,
+                (account_key(account_token), table_name, after, run, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def remove_merge_ids(self, account_token: str, table_name: str, merge_ids: List[str]) -> None:
+        key = account_key(account_token)
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM merge_ids WHERE account_key = ? AND table_name = ? AND merge_id = ?",
+                ((key, table_name, merge_id) for merge_id in merge_ids),
+            )
+            self.conn.commit()
+
+    def get_checkpoint(self, account_token: str, table_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                """
+                SELECT cursor, pages, rows_written, start_watermark, latest, full
+                FROM sync_checkpoints WHERE account_key = ? AND table_name = ?
+                """,
+                (account_key(account_token), table_name),
+            ).fetchone()
+        if not row:
+            return None
+        cursor, pages, rows_written, start_watermark, latest, full = row
+        return {
+            "cursor": cursor,
+            "pages": pages,
+            "rows_written": rows_written,
+            "start_watermark": start_watermark,
+            "latest": latest,
+            "full": bool(full),
+        }
+
+    def set_checkpoint(
+        self,
+        account_token: str,
+        table_name: str,
+        cursor: Optional[str],
+        pages: int,
+        rows_written: int,
+        start_watermark: Optional[str],
+        latest: Optional[str],
+        full: bool,
+    ) -> None:
+        """
+        Record how far a sync has durably got: the cursor of the next page to
+        fetch and the totals for every page before it
+        """
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO sync_checkpoints
+                (account_key, table_name, cursor, pages, rows_written, start_watermark, latest, full, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    account_key(account_token), table_name, cursor, pages, rows_written,
+                    start_watermark, latest, int(full), datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            self.conn.commit()
+
+    def clear_checkpoint(self, account_token: str, table_name: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM sync_checkpoints WHERE account_key = ? AND table_name = ?",
+                (account_key(account_token), table_name),
+            )
+            self.conn.commit()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Shared instance used by the sync paths
+sync_state = SyncStateStore()
@@ -0,0 +1,406 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from candidate_transform import encode_json_bytes
+from ats_models import MODEL_REGISTRY, MergeModel, get_model
+from metrics import WEBHOOK_APPLY_LAG_SECONDS, WEBHOOK_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Signature key from the Merge dashboard's webhook settings; webhooks are
+# refused, and the queue is never opened, until it is set
+MERGE_WEBHOOK_SECRET = os.getenv("MERGE_WEBHOOK_SECRET", "")
+
+# Local durable queue for changes pushed by Merge webhooks
+WEBHOOK_QUEUE_PATH = os.getenv(
+    "WEBHOOK_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "webhook_queue.db")
+)
+# Seconds to wait after a record's first event so later events for it are coalesced
+WEBHOOK_COALESCE_SECONDS = float(os.getenv("WEBHOOK_COALESCE_SECONDS", "2"))
+# Most changes applied per micro-batch
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
+# Failed changes are retried with exponential backoff, then dropped
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "10"))
+WEBHOOK_MAX_BACKOFF = float(os.getenv("WEBHOOK_MAX_BACKOFF", "300"))
+# Longest the worker sleeps between checks when nothing notifies it
+WEBHOOK_IDLE_SECONDS = 30.0
+
+# Linked account ids mapped to account tokens, as "id=token,id=token"; webhooks
+# carry the linked account id, but the sync path needs the token
+WEBHOOK_ACCOUNTS = os.getenv("MERGE_WEBHOOK_ACCOUNTS", "")
+
+# Webhook event prefixes (the Merge common model) for each registered model
+WEBHOOK_EVENT_MODELS = {
+    "Candidate": "candidates",
+    "Job": "jobs",
+    "Application": "applications",
+    "ScheduledInterview": "interviews",
+    "Offer": "offers",
+    "Attachment": "attachments",
+}
+UPSERT_ACTIONS = ("added", "changed", "created", "updated")
+DELETE_ACTIONS = ("removed", "deleted")
+
+
+def load_webhook_accounts() -> Dict[str, str]:
+    """
+    Linked account id to account token map from MERGE_WEBHOOK_ACCOUNTS and
+    MERGE_LINKED_ACCOUNT_ID/MERGE_LINKED_ACCOUNT_TOKEN
+    """
+    accounts = {}
+    for pair in WEBHOOK_ACCOUNTS.split(","):
+        linked_account_id, _, token = pair.strip().partition("=")
+        if linked_account_id and token:
+            accounts[linked_account_id.strip()] = token.strip()
+    linked_account_id = os.getenv("MERGE_LINKED_ACCOUNT_ID")
+    token = os.getenv("MERGE_LINKED_ACCOUNT_TOKEN")
+    if linked_account_id and token:
+        accounts.setdefault(linked_account_id, token)
+    return accounts
+
+
+def parse_event(event: str) -> Optional[Tuple[MergeModel, str]]:
+    """
+    Resolve a webhook event name (e.g. "Candidate.changed") to its model and
+    queue action ("upsert" or "delete"), or None when it is not synced
+    """
+    prefix, _, suffix = (event or "").partition(".")
+    name = WEBHOOK_EVENT_MODELS.get(prefix)
+    if name is None or name not in MODEL_REGISTRY:
+        return None
+    suffix = suffix.lower()
+    if suffix in UPSERT_ACTIONS:
+        return get_model(name), "upsert"
+    if suffix in DELETE_ACTIONS:
+        return get_model(name), "delete"
+    return None
+
+
+class WebhookQueue:
+    """
+    SQLite-backed queue of webhook changes, coalesced per record
+
+    Each record has at most one pending row, keyed by linked account, model
+    and merge_id. A new event replaces the pending payload when it is at least
+    as recent (deletes always win), and bumps the row's version; the row keeps
+    the time of its first event, so a burst of events for one record becomes
+    a single write once the coalescing window has passed.
+    """
+
+    def __init__(self, path: str = WEBHOOK_QUEUE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS webhook_events (
+                    linked_account_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    merge_id TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    payload BLOB,
+                    modified_at TEXT NOT NULL,
+                    received_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    events INTEGER NOT NULL DEFAULT 1,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    not_before REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (linked_account_id, model, merge_id)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS webhook_events_ready ON webhook_events (received_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def enqueue(self, linked_account_id: str, model: str, action: str, record: Dict[str, Any]) -> None:
+        """
+        Add a change, coalescing it with the record's pending change if there is one
+
+        Args:
+            linked_account_id (str): Merge linked account id from the webhook
+            model (str): Registry name of the record's model
+            action (str): "upsert" or "delete"
+            record (Dict[str, Any]): The record from the webhook payload
+        """
+        now = time.time()
+        modified_at = record.get("modified_at") or datetime.now(timezone.utc).isoformat()
+        payload = encode_json_bytes(record) if action == "upsert" else None
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT INTO webhook_events
+                    (linked_account_id, model, merge_id, action, payload, modified_at, received_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (linked_account_id, model, merge_id) DO UPDATE SET
+                    action = excluded.action,
+                    payload = excluded.payload,
+                    modified_at = excluded.modified_at,
+                    updated_at = excluded.updated_at,
+                    version = webhook_events.version + 1,
+                    events = webhook_events.events + 1,
+                    attempts = 0,
+                    not_before = 0
+                WHERE excluded.action = 'delete' OR excluded.modified_at >= webhook_events.modified_at
+                """,
+                (linked_account_id, model, str(record["id"]), action, payload, modified_at, now, now),
+            )
+            self.conn.commit()
+
+    def claim(self, limit: int = WEBHOOK_BATCH_SIZE, window: float = WEBHOOK_COALESCE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Changes whose coalescing window has passed and that are not backing off
+
+        Rows stay in the queue until they are acknowledged, so a crash before
+        the write replays them on the next start.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                SELECT linked_account_id, model, merge_id, action, payload, received_at, version, events, attempts
+                FROM webhook_events
+                WHERE received_at <= ? AND not_before <= ?
+                ORDER BY received_at
+                LIMIT ?
+                """,
+                (now - window, now, limit),
+            ).fetchall()
+        return [
+            {
+                "linked_account_id": row[0],
+                "model": row[1],
+                "merge_id": row[2],
+                "action": row[3],
+                "record": json.loads(row[4]) if row[4] is not None else None,
+                "received_at": row[5],
+                "version": row[6],
+                "events": row[7],
+                "attempts": row[8],
+            }
+            for row in rows
+        ]
+
+    def ack(self, changes: List[Dict[str, Any]]) -> None:
+        """
+        Remove applied changes, unless a newer event arrived while they were applied
+        """
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM webhook_events WHERE linked_account_id = ? AND model = ? AND merge_id = ? AND version = ?",
+                [(c["linked_account_id"], c["model"], c["merge_id"], c["version"]) for c in changes],
+            )
+            self.conn.commit()
+
+    def fail(self, changes: List[Dict[str, Any]], max_attempts: int = WEBHOOK_MAX_ATTEMPTS) -> int:
+        """
+        Schedule failed changes for a retry with exponential backoff
+
+        Returns:
+            int: Changes dropped because they ran out of attempts
+        """
+        now = time.time()
+        retry, dropped = [], []
+        for change in changes:
+            attempts = change["attempts"] + 1
+            if attempts >= max_attempts:
+                dropped.append(change)
+            else:
+                backoff = min(2 ** attempts, WEBHOOK_MAX_BACKOFF)
+                retry.append((attempts, now + backoff, change["linked_account_id"], change["model"], change["merge_id"]))
+        with self._lock:
+            self.conn.executemany(
+                """
+                UPDATE webhook_events SET attempts = ?, not_before = ?
+                WHERE linked_account_id = ? AND model = ? AND merge_id = ?
+                """,
+                retry,
+            )
+            self.conn.commit()
+        if dropped:
+            self.ack(dropped)
+        return len(dropped)
+
+    def next_ready_at(self, window: float = WEBHOOK_COALESCE_SECONDS) -> Optional[float]:
+        """
+        Time the earliest pending change becomes ready, or None if the queue is empty
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MIN(MAX(received_at + ?, not_before)) FROM webhook_events", (window,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def depth(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM webhook_events").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                SELECT model, action, COUNT(*), SUM(events), SUM(attempts > 0), MIN(received_at)
+                FROM webhook_events GROUP BY model, action
+                """
+            ).fetchall()
+        now = time.time()
+        return {
+            "depth": sum(row[2] for row in rows),
+            "pending": [
+                {
+                    "model": model,
+                    "action": action,
+                    "records": records,
+                    "events": events,
+                    "retrying": retrying,
+                    "oldest_seconds": round(now - oldest, 1),
+                }
+                for model, action, records, events, retrying, oldest in rows
+            ],
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class WebhookIngestor:
+    """
+    Background worker that applies queued webhook changes in micro-batches
+
+    Ready changes are grouped by linked account and model and applied in
+    dependency order (candidates and jobs before applications) through
+    merge_supabase.apply_record_changes, one upsert and one soft delete per
+    group. The worker sleeps until the next change becomes ready, or until
+    the webhook route notifies it of a new event. It only runs when
+    webhooks are configured (MERGE_WEBHOOK_SECRET is set).
+    """
+
+    def __init__(
+        self,
+        queue: WebhookQueue,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        enabled: bool = bool(MERGE_WEBHOOK_SECRET),
+    ):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self.accounts = load_webhook_accounts()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if not self.enabled:
+            logger.info("MERGE_WEBHOOK_SECRET is not set; webhook ingestion is off")
+            return
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before the queue is read, so a notify() that arrives while
+            # draining or computing the next ready time still wakes the wait below
+            self._wakeup.clear()
+            try:
+                applied = await self.drain()
+            except Exception as e:
+                logger.exception("Error applying webhook changes: %s", e)
+                applied = 0
+            if applied:
+                continue
+            next_ready = await asyncio.to_thread(self.queue.next_ready_at)
+            delay = WEBHOOK_IDLE_SECONDS if next_ready is None else max(next_ready - time.time(), 0.05)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, WEBHOOK_IDLE_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self) -> int:
+        """
+        Apply one micro-batch of ready changes
+
+        Returns:
+            int: Changes taken from the queue (applied, dropped or rescheduled)
+        """
+        # Imported here so this module does not pull in the Supabase client
+        from merge_supabase import apply_record_changes
+
+        changes = await asyncio.to_thread(self.queue.claim, self.batch_size)
+        WEBHOOK_QUEUE_DEPTH.set(await asyncio.to_thread(self.queue.depth))
+        if not changes:
+            return 0
+
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        for change in changes:
+            groups[(change["linked_account_id"], change["model"])].append(change)
+        order = {name: position for position, name in enumerate(MODEL_REGISTRY)}
+
+        for (linked_account_id, model_name), group in sorted(groups.items(), key=lambda item: order.get(item[0][1], 0)):
+            token = self.accounts.get(linked_account_id)
+            if token is None or model_name not in MODEL_REGISTRY:
+                logger.warning("Dropping %d queued %s changes for unknown linked account %s", len(group), model_name, linked_account_id)
+                await asyncio.to_thread(self.queue.ack, group)
+                continue
+            model = get_model(model_name)
+            records = [change["record"] for change in group if change["action"] == "upsert"]
+            deleted_ids = [change["merge_id"] for change in group if change["action"] == "delete"]
+            try:
+                result = await apply_record_changes(token, model, records, deleted_ids)
+            except Exception as e:
+                dropped = await asyncio.to_thread(self.queue.fail, group)
+                logger.error(
+                    f"Error applying {len(group)} webhook changes to {model.table_name}: {str(e)}"
+                    + (f"; dropped {dropped} after {WEBHOOK_MAX_ATTEMPTS} attempts" if dropped else "")
+                )
+                continue
+            await asyncio.to_thread(self.queue.ack, group)
+            now = time.time()
+            for change in group:
+                WEBHOOK_APPLY_LAG_SECONDS.observe(now - change["received_at"], model=model_name)
+            logger.info(
+                f"Applied {sum(change['events'] for change in group)} webhook events for {len(group)} "
+                f"{model_name} records: {result['written']} written, {result['unchanged']} unchanged, "
+                f"{result['deleted']} deleted"
+            )
+
+        WEBHOOK_QUEUE_DEPTH.set(await asyncio.to_thread(self.queue.depth))
+        return len(changes)
+
+
+# Shared instances used by the webhook route and the app lifespan
+webhook_queue = WebhookQueue()
+webhook_ingestor = WebhookIngestor(webhook_queue)
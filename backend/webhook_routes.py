@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+import hmac
+import json
+import base64
+import asyncio
+import hashlib
+import logging
+
+from metrics import WEBHOOK_EVENTS
+from webhook_queue import MERGE_WEBHOOK_SECRET, webhook_queue, webhook_ingestor, parse_event
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Merge-Webhook-Signature"
+
+# Create router
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+def verify_signature(body: bytes, signature: str, secret: str = MERGE_WEBHOOK_SECRET) -> bool:
+    """
+    Check a Merge webhook signature: the URL-safe base64 HMAC-SHA256 of the raw body
+    """
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()
+    expected = base64.urlsafe_b64encode(digest).rstrip(b"=")
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters.
+    # Senders that strip the base64 padding are tolerated.
+    received = (signature or "").strip().rstrip("=").encode("utf-8", "replace")
+    return hmac.compare_digest(expected, received)
+
+@router.post("/merge")
+async def receive_merge_webhook(request: Request):
+    """
+    Receive a Merge webhook and queue the change it carries
+
+    The change is stored in the local webhook queue before the response is
+    sent, and applied to Supabase in a micro-batch once its coalescing window
+    has passed. Events for models that are not synced, and for linked accounts
+    without a configured token, are acknowledged and ignored so Merge does
+    not retry them.
+    """
+    if not MERGE_WEBHOOK_SECRET:
+        logger.error("MERGE_WEBHOOK_SECRET is not set; refusing webhook")
+        return JSONResponse(status_code=503, content={"success": False, "message": "Webhooks are not configured"})
+
+    body = await request.body()
+    if not verify_signature(body, request.headers.get(SIGNATURE_HEADER, "")):
+        WEBHOOK_EVENTS.inc(model="", result="bad_signature")
+        return JSONResponse(status_code=401, content={"success": False, "message": "Invalid webhook signature"})
+
+    try:
+        payload = json.loads(body)
+        event = (payload.get("hook") or {}).get("event", "")
+        linked_account_id = (payload.get("linked_account") or {}).get("id")
+        record = payload.get("data") or {}
+    except (ValueError, AttributeError) as e:
+        WEBHOOK_EVENTS.inc(model="", result="invalid")
+        return JSONResponse(status_code=400, content={"success": False, "message": f"Error: {str(e)}"})
+
+    parsed = parse_event(event)
+    if parsed is None:
+        WEBHOOK_EVENTS.inc(model="", result="ignored")
+        return {"success": True, "queued": False, "message": f"Event '{event}' is not synced"}
+    model, action = parsed
+
+    if linked_account_id not in webhook_ingestor.accounts:
+        logger.warning("Ignoring %s webhook for unknown linked account %s", event, linked_account_id)
+        WEBHOOK_EVENTS.inc(model=model.name, result="unknown_account")
+        return {"success": True, "queued": False, "message": "Linked account is not configured"}
+    if not isinstance(record, dict) or not record.get("id"):
+        WEBHOOK_EVENTS.inc(model=model.name, result="invalid")
+        return JSONResponse(status_code=400, content={"success": False, "message": "Webhook data has no record id"})
+
+    try:
+        await asyncio.to_thread(webhook_queue.enqueue, linked_account_id, model.name, action, record)
+    except Exception as e:
+        logger.error("Error queueing webhook: %s", e)
+        WEBHOOK_EVENTS.inc(model=model.name, result="error")
+        # A 5xx makes Merge redeliver the event
+        return JSONResponse(status_code=500, content={"success": False, "message": f"Error: {str(e)}"})
+
+    WEBHOOK_EVENTS.inc(model=model.name, result="queued")
+    webhook_ingestor.notify()
+    return {"success": True, "queued": True, "model": model.name, "action": action}
+
+@router.get("/queue")
+async def get_webhook_queue():
+    """
+    Get the changes waiting in the webhook queue, by model and action
+    """
+    if not MERGE_WEBHOOK_SECRET:
+        return JSONResponse(status_code=503, content={"success": False, "message": "Webhooks are not configured"})
+    return await asyncio.to_thread(webhook_queue.stats)
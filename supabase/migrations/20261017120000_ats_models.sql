@@ -0,0 +1,140 @@
+/*
+  # ATS Model Tables
+
+  1. New Tables
+    - jobs
+      - merge_id (text, unique)
+      - name, status, type (text)
+      - departments/offices/hiring managers/recruiters (jsonb text)
+
+    - applications
+      - merge_id (text, unique)
+      - candidate_merge_id (text, Merge id of the candidate)
+      - job_merge_id (text, Merge id of the job)
+
+    - interviews
+      - merge_id (text, unique)
+      - application_merge_id (text, Merge id of the application)
+
+    - offers
+      - merge_id (text, unique)
+      - application_merge_id (text, Merge id of the application)
+
+    - attachments
+      - merge_id (text, unique)
+      - candidate_merge_id (text, Merge id of the candidate)
+
+  2. Notes
+    - Parent ids are plain indexed columns, not foreign keys: candidates is
+      not created by a migration, table names can be overridden per sync,
+      and Merge can return a child before its parent has been synced. The
+      sync engine writes parents first, so joins on merge_id resolve once
+      both syncs have run
+*/
+
+-- Create jobs table
+CREATE TABLE IF NOT EXISTS jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  merge_id TEXT NOT NULL UNIQUE,
+  remote_id TEXT,
+  name TEXT,
+  description TEXT,
+  code TEXT,
+  status TEXT,
+  type TEXT,
+  confidential BOOLEAN DEFAULT false,
+  created_at TEXT,
+  modified_at TEXT,
+  remote_created_at TEXT,
+  remote_updated_at TEXT,
+  job_posting_urls_json TEXT,
+  departments_json TEXT,
+  offices_json TEXT,
+  hiring_managers_json TEXT,
+  recruiters_json TEXT,
+  field_mappings_json TEXT,
+  remote_was_deleted BOOLEAN DEFAULT false
+);
+
+-- Create applications table
+CREATE TABLE IF NOT EXISTS applications (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  merge_id TEXT NOT NULL UNIQUE,
+  remote_id TEXT,
+  candidate_merge_id TEXT,
+  job_merge_id TEXT,
+  applied_at TEXT,
+  rejected_at TEXT,
+  source TEXT,
+  credited_to TEXT,
+  current_stage TEXT,
+  reject_reason TEXT,
+  created_at TEXT,
+  modified_at TEXT,
+  remote_created_at TEXT,
+  remote_updated_at TEXT,
+  offers_json TEXT,
+  field_mappings_json TEXT,
+  remote_was_deleted BOOLEAN DEFAULT false
+);
+
+-- Create interviews table
+CREATE TABLE IF NOT EXISTS interviews (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  merge_id TEXT NOT NULL UNIQUE,
+  remote_id TEXT,
+  application_merge_id TEXT,
+  job_interview_stage TEXT,
+  organizer TEXT,
+  location TEXT,
+  start_at TEXT,
+  end_at TEXT,
+  status TEXT,
+  created_at TEXT,
+  modified_at TEXT,
+  remote_created_at TEXT,
+  remote_updated_at TEXT,
+  interviewers_json TEXT,
+  field_mappings_json TEXT,
+  remote_was_deleted BOOLEAN DEFAULT false
+);
+
+-- Create offers table
+CREATE TABLE IF NOT EXISTS offers (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  merge_id TEXT NOT NULL UNIQUE,
+  remote_id TEXT,
+  application_merge_id TEXT,
+  creator TEXT,
+  status TEXT,
+  closed_at TEXT,
+  sent_at TEXT,
+  start_date TEXT,
+  created_at TEXT,
+  modified_at TEXT,
+  remote_created_at TEXT,
+  field_mappings_json TEXT,
+  remote_was_deleted BOOLEAN DEFAULT false
+);
+
+-- Create attachments table
+CREATE TABLE IF NOT EXISTS attachments (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  merge_id TEXT NOT NULL UNIQUE,
+  remote_id TEXT,
+  candidate_merge_id TEXT,
+  file_name TEXT,
+  file_url TEXT,
+  attachment_type TEXT,
+  created_at TEXT,
+  modified_at TEXT,
+  field_mappings_json TEXT,
+  remote_was_deleted BOOLEAN DEFAULT false
+);
+
+-- Create indexes
+CREATE INDEX IF NOT EXISTS idx_applications_candidate_merge_id ON applications(candidate_merge_id);
+CREATE INDEX IF NOT EXISTS idx_applications_job_merge_id ON applications(job_merge_id);
+CREATE INDEX IF NOT EXISTS idx_interviews_application_merge_id ON interviews(application_merge_id);
+CREATE INDEX IF NOT EXISTS idx_offers_application_merge_id ON offers(application_merge_id);
+CREATE INDEX IF NOT EXISTS idx_attachments_candidate_merge_id ON attachments(candidate_merge_id);